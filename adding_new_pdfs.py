@@ -2,60 +2,37 @@ import sys
 import os
 import json
 import hashlib
-import requests
 from pathlib import Path
 import logging
 import time
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from sansad_client import SansadClient, fetch_all_questions
+from src.azure_vector_store import AzureVectorStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 MONITOR_STATE_PATH = Path("website_data/ministry_web_monitor.json")
 MINISTRY_CODES = [59, 12, 39]
-API_URL = "https://sansad.in/api_ls/question/qetFilteredQuestionsAns"
 
 # Ensure directory exists
 os.makedirs(MONITOR_STATE_PATH.parent, exist_ok=True)
 
 def fetch_ministry_digest(ministry_code, session_number=5, loksabha_no=18):
-    pdf_urls = []
-    page_no = 1
-    page_size = 20
-    while True:
-        params = {
-            "loksabhaNo": str(loksabha_no),
-            "sessionNumber": str(session_number),
-            "pageNo": str(page_no),
-            "locale": "en",
-            "pageSize": str(page_size),
-            "ministryCode": str(ministry_code)
-        }
-        r = requests.get(API_URL, params=params, timeout=40)
-        if r.status_code != 200:
-            break
-        data = r.json()
-        if not data or not data[0]["listOfQuestions"]:
-            break
-        questions = data[0]["listOfQuestions"]
-        
-        # Extract PDF URLs from questions
-        for q in questions:
-            if q.get("questionsFilePath"):
-                pdf_urls.append(q["questionsFilePath"])
-                
-        page_no += 1
-        time.sleep(0.2)
-    
-    # Remove duplicates and sort
-    clean_set = sorted(set(pdf_urls))
-    return clean_set
+    questions = fetch_all_questions(ministry_code, session_number, loksabha_no)
+
+    # Extract PDF URLs from questions, removing duplicates in first-seen order
+    pdf_urls = [q["questionsFilePath"] for q in questions if q.get("questionsFilePath")]
+    return list(dict.fromkeys(pdf_urls))
 
 def calc_hash(pdf_list):
-    m = hashlib.sha256()
-    joined = "\n".join(sorted(pdf_list))
-    m.update(joined.encode("utf-8"))
-    return m.hexdigest()
+    # XOR of per-URL digests: order-independent, so the (deduplicated) list
+    # needs no sorting.
+    acc = 0
+    for url in pdf_list:
+        acc ^= int.from_bytes(hashlib.sha256(url.encode("utf-8")).digest(), "big")
+    return acc.to_bytes(32, "big").hex()
 
 def load_state():
     if MONITOR_STATE_PATH.exists():
@@ -70,9 +47,12 @@ def save_state(state):
 def main():
     current_state = load_state()
     state_changed = False
+    vector_store = None
+
+    with ThreadPoolExecutor(max_workers=len(MINISTRY_CODES)) as executor:
+        digests = dict(zip(MINISTRY_CODES, executor.map(fetch_ministry_digest, MINISTRY_CODES)))
 
-    for code in MINISTRY_CODES:
-        pdfs = fetch_ministry_digest(code)
+    for code, pdfs in digests.items():
         hash_val = calc_hash(pdfs)
         key = f"{code}"
         stored = current_state.get(key, {})
@@ -85,7 +65,12 @@ def main():
                 "last_checked": time.strftime("%Y-%m-%dT%H:%M:%S")
             }
             logger.info(f"Triggering ingestion for ministry code {code}")
-            subprocess.call([sys.executable, "sansad_client.py", str(code)])
+            try:
+                if vector_store is None:
+                    vector_store = AzureVectorStore()
+                SansadClient(code, vector_store=vector_store).ingest()
+            except Exception as e:
+                logger.error(f"Ingestion failed for ministry code {code}: {e}")
         else:
             logger.info(f"No change for ministry code {code}, skipping ingestion.")
     save_state(current_state)
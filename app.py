@@ -1,6 +1,8 @@
 import streamlit as st
 import logging
 import base64
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
 
@@ -8,32 +10,86 @@ from src.config import Config
 from src.azure_vector_store import AzureVectorStore
 from src.document_processor import DocumentProcessor
 from src.llm_client import LLMClient
+from src.qv_cache import QVCache
+from src.reranker import rerank
 
 logging.basicConfig(level=Config.get_log_level())
 logger = logging.getLogger(__name__)
 
+@st.cache_resource
+def get_vector_store() -> AzureVectorStore:
+    return AzureVectorStore()
+
+@st.cache_resource
+def get_llm_client() -> LLMClient:
+    return LLMClient()
+
+@st.cache_resource
+def get_blob_service_client() -> BlobServiceClient:
+    return BlobServiceClient.from_connection_string(
+        Config.AZURE_STORAGE_CONNECTION_STRING
+    )
+
+SEARCH_CACHE_TTL = 3600
+
+@st.cache_resource
+def get_query_cache() -> QVCache:
+    return QVCache(ttl=SEARCH_CACHE_TTL)
+
+# Errors propagate instead of returning [], so st.cache_data never stores an
+# outage as an empty result.
+@st.cache_data(ttl=SEARCH_CACHE_TTL, max_entries=1024)
+def _cached_search(_vector_store: AzureVectorStore, query: str, ministry: str, n: int) -> list:
+    return _vector_store.search_by_text(query, ministry, n_results=n, raise_on_error=True)
+
+@st.cache_data(ttl=300)
+def _cached_ministry_counts(_vector_store: AzureVectorStore) -> dict:
+    return _vector_store.get_ministry_counts()
+
+def retrieve_documents(
+    vector_store: AzureVectorStore, query_cache: QVCache, query: str, ministry: str, n: int
+) -> tuple:
+    embedding = vector_store.embed_query(query)
+    cached = query_cache.get(ministry, embedding, n)
+    if cached is not None:
+        return cached
+
+    documents = _cached_search(vector_store, query, ministry, n)
+    if not documents:
+        return documents, None
+    best = min(documents, key=lambda doc: doc["distance"])
+    query_cache.put(ministry, embedding, documents, best["embedding"])
+    return documents, best["distance"]
+
+IRRELEVANCE_INDICATORS = [
+    "not relevant to",
+    "outside the scope",
+    "not related to parliamentary",
+    "not within the jurisdiction",
+    "unrelated to government",
+    "cannot answer this question as it is not relevant",
+    "appears to be outside the scope of parliamentary and governmental matters",
+    "not relevant to the ministry's affairs",
+    "not relevant to the ministry's functions",
+]
+_IRRELEVANCE_RE = re.compile(
+    "|".join(re.escape(s) for s in IRRELEVANCE_INDICATORS), re.IGNORECASE
+)
+
 def is_irrelevant_response(answer_text: str) -> bool:
-    irrelevance_indicators = [
-        "not relevant to",
-        "outside the scope",
-        "not related to parliamentary",
-        "not within the jurisdiction",
-        "unrelated to government",
-        "cannot answer this question as it is not relevant",
-        "appears to be outside the scope of parliamentary and governmental matters",
-        "not relevant to the ministry's affairs",
-        "not relevant to the ministry's functions",
-    ]
-
-    answer_lower = answer_text.lower()
-    return any(indicator in answer_lower for indicator in irrelevance_indicators)
-
-def get_document_sas_url(ministry: str, filename: str) -> str:
-    try:
-        blob_service_client = BlobServiceClient.from_connection_string(
-            Config.AZURE_STORAGE_CONNECTION_STRING
-        )
+    return _IRRELEVANCE_RE.search(answer_text) is not None
+
+def is_off_topic(best_distance: float) -> bool:
+    return best_distance > Config.MAX_RELEVANT_DISTANCE
+
+@st.cache_resource
+def get_sas_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=8)
 
+def get_document_sas_url(
+    blob_service_client: BlobServiceClient, ministry: str, filename: str
+) -> str:
+    try:
         container_name = "ministrydatastorage"
         blob_name = f"ministries/{ministry}/{filename}"
 
@@ -64,6 +120,18 @@ def get_document_sas_url(ministry: str, filename: str) -> str:
         logger.error(f"Error generating SAS URL for {filename}: {e}")
         return None
 
+def submit_document_sas_urls(
+    blob_service_client: BlobServiceClient, ministry: str, filenames: list
+) -> dict:
+    executor = get_sas_executor()
+    return {
+        filename: executor.submit(
+            get_document_sas_url, blob_service_client, ministry, filename
+        )
+        for filename in dict.fromkeys(filenames)
+        if filename != "document.pdf"
+    }
+
 def extract_filename_from_metadata(metadata: dict) -> str:
     for key in ["filename", "source", "file", "document_name"]:
         if key in metadata and metadata[key]:
@@ -90,12 +158,14 @@ def main():
         st.stop()
 
     try:
-        vector_store = AzureVectorStore()
-        llm_client = LLMClient()
+        vector_store = get_vector_store()
+        llm_client = get_llm_client()
+        query_cache = get_query_cache()
 
         st.sidebar.header("Settings")
 
-        ministries = list(vector_store.indexed_ministries)
+        ministry_counts = _cached_ministry_counts(vector_store)
+        ministries = sorted(ministry_counts) or list(vector_store.indexed_ministries)
         if not ministries:
             st.warning("No ministries indexed yet. Please run the indexing process.")
             st.sidebar.info(
@@ -106,6 +176,9 @@ def main():
         selected_ministry = st.sidebar.selectbox(
             "Select Ministry", ministries, help="Choose a ministry to search within"
         )
+        st.sidebar.metric(
+            "Indexed passages", ministry_counts.get(selected_ministry, 0)
+        )
 
         user_question = st.text_area(
             "Ask your question:",
@@ -118,23 +191,53 @@ def main():
         if search_button and user_question.strip():
             with st.spinner("Loading, Please wait..."):
                 try:
-                    relevant_docs = vector_store.search_by_text(
-                        user_question, selected_ministry, n_results=5
+                    candidate_docs, best_distance = retrieve_documents(
+                        vector_store,
+                        query_cache,
+                        user_question.strip(),
+                        selected_ministry,
+                        Config.RERANK_CANDIDATES,
+                    )
+                    if candidate_docs and is_off_topic(best_distance):
+                        st.info(
+                            "Alert: This question is not relevant to the ministry affairs."
+                        )
+                        return
+
+                    relevant_docs = rerank(
+                        user_question.strip(), candidate_docs, Config.RERANK_TOP_K
                     )
 
                     if relevant_docs:
-                        context = "\n\n".join([doc["text"] for doc in relevant_docs])
-                        answer = llm_client.generate_answer(
-                            user_question, context, selected_ministry
+                        # Links are signed on the pool while the answer streams.
+                        # The client is resolved here: cache_resource needs the
+                        # script thread's context.
+                        source_url_futures = submit_document_sas_urls(
+                            get_blob_service_client(),
+                            selected_ministry,
+                            [
+                                extract_filename_from_metadata(doc.get("metadata", {}))
+                                for doc in relevant_docs
+                            ],
                         )
-
+                        context = "\n\n".join([doc["text"] for doc in relevant_docs])
                         st.subheader("Ministry Response")
-                        st.write(answer)
+                        answer = st.write_stream(
+                            llm_client.generate_answer_stream(
+                                user_question, context, selected_ministry
+                            )
+                        )
 
                         is_irrelevant = is_irrelevant_response(answer)
 
                         if not is_irrelevant:
                             with st.expander("View Source Documents"):
+                                with st.spinner("Generating secure links..."):
+                                    source_urls = {
+                                        filename: future.result()
+                                        for filename, future in source_url_futures.items()
+                                    }
+
                                 for i, doc in enumerate(relevant_docs, 1):
                                     st.markdown(f"**Source {i}**")
                                     
@@ -147,8 +250,7 @@ def main():
                                     if filename != "document.pdf":
                                         try:
                                             
-                                            with st.spinner(f"Generating secure link for {filename}..."):
-                                                doc_url = get_document_sas_url(selected_ministry, filename)
+                                            doc_url = source_urls.get(filename)
                                             
                                             if doc_url:
                                                 st.markdown(
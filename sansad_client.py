@@ -1,8 +1,12 @@
 import sys
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import logging
-import time
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from pathlib import Path
 import sqlalchemy as sa
@@ -24,66 +28,132 @@ MINISTRY_CODE_TO_NAME = {
 }
 
 API_URL = "https://sansad.in/api_ls/question/qetFilteredQuestionsAns"
+PAGE_FETCH_WORKERS = 6
+
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.3),
+    ),
+)
+
+
+def fetch_questions_page(
+    ministry_code, page_no, session_number=5, loksabha_no=18, page_size=20
+):
+    params = {
+        "loksabhaNo": str(loksabha_no),
+        "sessionNumber": str(session_number),
+        "pageNo": str(page_no),
+        "locale": "en",
+        "pageSize": str(page_size),
+        "ministryCode": str(ministry_code),
+    }
+    r = SESSION.get(API_URL, params=params, timeout=40)
+    if r.status_code != 200:
+        logger.error(f"API request failed: {r.status_code} {r.text}")
+        return None
+    data = r.json()
+    if not data or not data[0]["listOfQuestions"]:
+        return None
+    return data[0]
+
+
+def fetch_all_questions(ministry_code, session_number=5, loksabha_no=18, page_size=20):
+    ministry = MINISTRY_CODE_TO_NAME.get(ministry_code, ministry_code)
+    first_page = fetch_questions_page(
+        ministry_code, 1, session_number, loksabha_no, page_size
+    )
+    if first_page is None:
+        logger.info(f"Fetched 0 total questions for {ministry}")
+        return []
+
+    all_questions = list(first_page["listOfQuestions"])
+    total = int(first_page["totalRecordSize"])
+    logger.info(f"{ministry} page 1: {len(all_questions)} questions")
+
+    page_numbers = range(2, math.ceil(total / page_size) + 1)
+    if page_numbers:
+        with ThreadPoolExecutor(max_workers=PAGE_FETCH_WORKERS) as executor:
+            pages = executor.map(
+                lambda page_no: fetch_questions_page(
+                    ministry_code, page_no, session_number, loksabha_no, page_size
+                ),
+                page_numbers,
+            )
+            for page_no, page in zip(page_numbers, pages):
+                if page is None:
+                    continue
+                questions = page["listOfQuestions"]
+                all_questions.extend(questions)
+                logger.info(f"{ministry} page {page_no}: {len(questions)} questions")
+    logger.info(f"Fetched {len(all_questions)} total questions for {ministry}")
+    return all_questions
+
+
+def _bounded_map(executor, fn, items, window):
+    # executor.map submits everything up front; keeping at most `window`
+    # calls in flight stops finished results piling up ahead of the consumer.
+    in_flight = deque()
+    for item in items:
+        if len(in_flight) >= window:
+            yield in_flight.popleft().result()
+        in_flight.append(executor.submit(fn, item))
+    while in_flight:
+        yield in_flight.popleft().result()
 
 
 class SansadClient:
-    def __init__(self, ministry_code, session_number=5, loksabha_no=18, page_size=20):
+    def __init__(
+        self,
+        ministry_code,
+        session_number=5,
+        loksabha_no=18,
+        page_size=20,
+        vector_store=None,
+    ):
         self.ministry_code = ministry_code
         self.ministry = MINISTRY_CODE_TO_NAME[ministry_code]
         self.session_number = session_number
         self.loksabha_no = loksabha_no
         self.page_size = page_size
-        self.vector_store = AzureVectorStore()
+        self.vector_store = vector_store or AzureVectorStore()
         self.document_processor = DocumentProcessor()
         self.storage = AzureBlobStorage()
 
+    def fetch_questions_page(self, page_no):
+        return fetch_questions_page(
+            self.ministry_code,
+            page_no,
+            self.session_number,
+            self.loksabha_no,
+            self.page_size,
+        )
+
     def fetch_all_questions(self):
-        all_questions = []
-        page_no = 1
-        total = None
-        while True:
-            params = {
-                "loksabhaNo": str(self.loksabha_no),
-                "sessionNumber": str(self.session_number),
-                "pageNo": str(page_no),
-                "locale": "en",
-                "pageSize": str(self.page_size),
-                "ministryCode": str(self.ministry_code),
-            }
-            r = requests.get(API_URL, params=params, timeout=40)
-            if r.status_code != 200:
-                logger.error(f"API request failed: {r.status_code} {r.text}")
-                break
-            data = r.json()
-            if not data or not data[0]["listOfQuestions"]:
-                break
-            questions = data[0]["listOfQuestions"]
-            total = int(data[0]["totalRecordSize"])
-            all_questions.extend(questions)
-            logger.info(f"{self.ministry} page {page_no}: {len(questions)} questions")
-            if len(all_questions) >= total:
-                break
-            page_no += 1
-            time.sleep(0.25)
-        logger.info(f"Fetched {len(all_questions)} total questions for {self.ministry}")
-        return all_questions
-
-    def is_pdf_in_db(self, filename):
+        return fetch_all_questions(
+            self.ministry_code, self.session_number, self.loksabha_no, self.page_size
+        )
+
+    def get_ingested_sources(self):
         session = self.vector_store.Session()
         try:
-            existing = session.execute(
+            result = session.execute(
                 sa.text(
-                    "SELECT 1 FROM documents WHERE doc_metadata->>'source' = :filename LIMIT 1"
+                    "SELECT DISTINCT doc_metadata->>'source' FROM documents WHERE ministry = :ministry"
                 ),
-                {"filename": filename},
+                {"ministry": self.ministry},
             )
-            return existing.first() is not None
+            return {row[0] for row in result}
         finally:
             session.close()
 
     def fetch_pdf_bytes(self, url):
         try:
-            r = requests.get(url, stream=True, timeout=60)
+            r = SESSION.get(url, stream=True, timeout=60)
             r.raise_for_status()
             return r.content
         except Exception as e:
@@ -92,8 +162,8 @@ class SansadClient:
 
     def process_pdf_from_bytes(self, pdf_bytes, filename, pdf_url=None):
         try:
-            reader = self.document_processor.get_pdf_reader_from_bytes(pdf_bytes)
-            text = self.document_processor.extract_text_from_pdf_reader(reader)
+            with self.document_processor.get_pdf_reader_from_bytes(pdf_bytes) as reader:
+                text = self.document_processor.extract_text_from_pdf_reader(reader)
             if not text:
                 logger.warning(f"No text extracted from PDF {filename}")
                 return []
@@ -120,44 +190,91 @@ class SansadClient:
             return []
 
 
+    def fetch_question_pdf(self, q, ingested_sources):
+        pdf_url = q.get("questionsFilePath")
+        if not pdf_url:
+            return None
+        try:
+            filename = pdf_url.split("/")[-1].split("?")[0]
+            if filename in ingested_sources:
+                logger.info(f"{filename} already in database. Skipping.")
+                return None
+            pdf_bytes = self.fetch_pdf_bytes(pdf_url)
+            if pdf_bytes is None:
+                return None
+            return filename, pdf_url, pdf_bytes
+        except Exception as e:
+            logger.error(f"Error fetching question PDF {pdf_url}: {e}")
+            return None
+
+    def upload_pdf_bytes(self, pdf_bytes, filename):
+        try:
+            self.storage.upload_bytes(pdf_bytes, f"ministries/{self.ministry}/{filename}")
+            logger.info(f"Uploaded {filename} to Azure Blob Storage")
+        except Exception as e:
+            logger.error(f"Failed to upload {filename} to blob storage: {e}")
+
+    def flush_documents(self, pending):
+        if not pending:
+            return
+        documents = [doc for _, docs in pending for doc in docs]
+        self.vector_store.add_documents(
+            documents, self.ministry, batch_size=Config.INGEST_FLUSH_CHUNKS
+        )
+        for filename, docs in pending:
+            logger.info(f"Ingested {filename} with {len(docs)} chunks")
+        pending.clear()
+
     def ingest(self):
         questions = self.fetch_all_questions()
+        ingested_sources = self.get_ingested_sources()
 
         ingested_files = 0
-        for q in questions:
-            try:
-                pdf_url = q.get("questionsFilePath")
-                if not pdf_url:
-                    continue
-                filename = pdf_url.split("/")[-1].split("?")[0]
-                if self.is_pdf_in_db(filename):
-                    logger.info(f"{filename} already in database. Skipping.")
-                    continue
-                pdf_bytes = self.fetch_pdf_bytes(pdf_url)
-                if pdf_bytes is None:
+        pending = []
+        pending_chunks = 0
+        # Downloads and uploads run on threads; PyMuPDF is not thread-safe, so
+        # every PDF is parsed here on the consuming thread. Both sides hold at
+        # most `window` PDFs in flight, bounding memory to a few dozen files.
+        window = Config.INGEST_WORKERS * 2
+        uploads = deque()
+        with ThreadPoolExecutor(
+            max_workers=Config.INGEST_WORKERS
+        ) as fetch_executor, ThreadPoolExecutor(
+            max_workers=Config.INGEST_WORKERS
+        ) as upload_executor:
+            fetched = _bounded_map(
+                fetch_executor,
+                lambda q: self.fetch_question_pdf(q, ingested_sources),
+                questions,
+                window,
+            )
+            for result in fetched:
+                if result is None:
                     continue
-                documents = self.process_pdf_from_bytes(pdf_bytes, filename,pdf_url)
+                filename, pdf_url, pdf_bytes = result
+                documents = self.process_pdf_from_bytes(pdf_bytes, filename, pdf_url)
                 if not documents:
                     continue
-                try:
-                    self.storage.upload_bytes(pdf_bytes, f"{self.ministry}/{filename}")
-                    logger.info(f"Uploaded {filename} to Azure Blob Storage")
-                except Exception as e:
-                    logger.error(f"Failed to upload {filename} to blob storage: {e}")
-                self.vector_store.add_documents(documents, self.ministry)
+                if len(uploads) >= window:
+                    uploads.popleft().result()
+                uploads.append(
+                    upload_executor.submit(self.upload_pdf_bytes, pdf_bytes, filename)
+                )
+                pending.append((filename, documents))
+                pending_chunks += len(documents)
                 ingested_files += 1
-                logger.info(f"Ingested {filename} with {len(documents)} chunks")
-                time.sleep(0.3)
-            except Exception as e:
-                logger.error(f"Error processing question with PDF {pdf_url}: {e}")
-                continue
+                if pending_chunks >= Config.INGEST_FLUSH_CHUNKS:
+                    self.flush_documents(pending)
+                    pending_chunks = 0
+        self.flush_documents(pending)
         logger.info(f"Completed ingest for {self.ministry}: {ingested_files} new files")
 
     @staticmethod
     def fetch_selected_ministries():
+        vector_store = AzureVectorStore()
         for code in MINISTRY_CODE_TO_NAME:
-            ingestor = SansadClient(code)
-            ingestor.ingest()    
+            ingestor = SansadClient(code, vector_store=vector_store)
+            ingestor.ingest()
 
 
 if __name__ == "__main__":
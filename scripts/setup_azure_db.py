@@ -0,0 +1,29 @@
+import sys
+import logging
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.azure_vector_store import create_db_engine, migrate_schema
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+
+    # The migration creates the vector extension itself and binds no vectors,
+    # so its connections skip adapter registration.
+    engine = create_db_engine(register_vector_types=False)
+    try:
+        migrate_schema(engine)
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        logger.error(f"Database setup failed: {e}")
+        sys.exit(1)
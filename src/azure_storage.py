@@ -1,8 +1,11 @@
+import asyncio
 import logging
 import os
 from pathlib import Path
 from typing import Optional, List
-from azure.storage.blob import BlobServiceClient, BlobClient
+from azure.storage.blob import BlobServiceClient, BlobClient, BlobType
+from azure.storage.blob.aio import BlobPrefix
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
 from azure.core.exceptions import ResourceNotFoundError, AzureError
 from .config import Config
 
@@ -18,7 +21,11 @@ class AzureBlobStorage:
             )
 
         self.blob_service_client = BlobServiceClient.from_connection_string(
-            Config.AZURE_STORAGE_CONNECTION_STRING
+            Config.AZURE_STORAGE_CONNECTION_STRING,
+            max_block_size=Config.BLOB_MAX_BLOCK_SIZE,
+            max_single_put_size=Config.BLOB_MAX_BLOCK_SIZE,
+            connection_timeout=Config.BLOB_CONNECTION_TIMEOUT,
+            read_timeout=Config.BLOB_READ_TIMEOUT,
         )
         self.container_name = Config.AZURE_STORAGE_CONTAINER
         self._ensure_container_exists()
@@ -44,7 +51,13 @@ class AzureBlobStorage:
             )
 
             with open(file_path, "rb") as data:
-                blob_client.upload_blob(data, overwrite=True)
+                blob_client.upload_blob(
+                    data,
+                    overwrite=True,
+                    length=os.path.getsize(file_path),
+                    blob_type=BlobType.BlockBlob,
+                    max_concurrency=Config.BLOB_MAX_CONCURRENCY,
+                )
 
             logger.info(f"Successfully uploaded {file_path} as {blob_name}")
             return blob_client.url
@@ -66,8 +79,10 @@ class AzureBlobStorage:
             os.makedirs(os.path.dirname(download_path), exist_ok=True)
 
             with open(download_path, "wb") as download_file:
-                download_data = blob_client.download_blob()
-                download_file.write(download_data.readall())
+                download_data = blob_client.download_blob(
+                    max_concurrency=Config.BLOB_MAX_CONCURRENCY
+                )
+                download_data.readinto(download_file)
 
             logger.info(f"Successfully downloaded {blob_name} to {download_path}")
             return True
@@ -82,17 +97,77 @@ class AzureBlobStorage:
             logger.error(f"Error downloading {blob_name}: {e}")
             return False
 
-    def list_pdfs(self, prefix: str = "") -> List[str]:
+    def download_pdf_to_bytes(self, blob_name: str) -> Optional[bytes]:
 
         try:
-            container_client = self.blob_service_client.get_container_client(
-                self.container_name
+            blob_client = self.blob_service_client.get_blob_client(
+                container=self.container_name, blob=blob_name
             )
+            return blob_client.download_blob(
+                max_concurrency=Config.BLOB_MAX_CONCURRENCY
+            ).readall()
+
+        except ResourceNotFoundError:
+            logger.error(f"Blob not found: {blob_name}")
+            return None
+        except AzureError as e:
+            logger.error(f"Azure error downloading {blob_name}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error downloading {blob_name}: {e}")
+            return None
+
+    @staticmethod
+    async def _list_prefix_pdfs(container_client, prefix: str) -> List[str]:
+
+        blob_names = []
+        async for name in container_client.list_blob_names(
+            name_starts_with=prefix, results_per_page=5000
+        ):
+            if name.lower().endswith(".pdf"):
+                blob_names.append(name)
+        return blob_names
+
+    async def list_pdfs_async(
+        self, prefix: str = "ministries/", ministry: str = None
+    ) -> List[str]:
 
-            blob_names = []
-            for blob in container_client.list_blobs(name_starts_with=prefix):
-                if blob.name.lower().endswith(".pdf"):
-                    blob_names.append(blob.name)
+        if ministry:
+            prefix = f"ministries/{ministry}/"
+
+        try:
+            async with AsyncBlobServiceClient.from_connection_string(
+                Config.AZURE_STORAGE_CONNECTION_STRING,
+                connection_timeout=Config.BLOB_CONNECTION_TIMEOUT,
+                read_timeout=Config.BLOB_READ_TIMEOUT,
+            ) as service_client:
+                container_client = service_client.get_container_client(
+                    self.container_name
+                )
+
+                # Pages of one listing are chained by continuation tokens, so
+                # split on the next "/" and list each sub-prefix concurrently.
+                blob_names = []
+                sub_prefixes = []
+                if ministry:
+                    sub_prefixes.append(prefix)
+                else:
+                    async for item in container_client.walk_blobs(
+                        name_starts_with=prefix, delimiter="/"
+                    ):
+                        if isinstance(item, BlobPrefix):
+                            sub_prefixes.append(item.name)
+                        elif item.name.lower().endswith(".pdf"):
+                            blob_names.append(item.name)
+
+                listings = await asyncio.gather(
+                    *(
+                        self._list_prefix_pdfs(container_client, sub_prefix)
+                        for sub_prefix in sub_prefixes
+                    )
+                )
+                for names in listings:
+                    blob_names.extend(names)
 
             logger.info(f"Found {len(blob_names)} PDF files with prefix '{prefix}'")
             return blob_names
@@ -104,6 +179,10 @@ class AzureBlobStorage:
             logger.error(f"Error listing blobs: {e}")
             return []
 
+    def list_pdfs(self, prefix: str = "ministries/", ministry: str = None) -> List[str]:
+
+        return asyncio.run(self.list_pdfs_async(prefix, ministry))
+
     def delete_pdf(self, blob_name: str) -> bool:
 
         try:
@@ -140,5 +219,7 @@ class AzureBlobStorage:
         blob_client = self.blob_service_client.get_blob_client(
             container=self.container_name, blob=blob_name
         )
-        blob_client.upload_blob(data_bytes, overwrite=True)
+        blob_client.upload_blob(
+            data_bytes, overwrite=True, max_concurrency=Config.BLOB_MAX_CONCURRENCY
+        )
         logger.info(f"Uploaded {blob_name} to Blob Storage")
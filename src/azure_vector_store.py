@@ -1,18 +1,119 @@
 import logging
+import hashlib
 import json
-from typing import List, Dict, Any, Optional
+import random
+import re
+import threading
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import numpy as np
 import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+import torch
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import SQLAlchemyError, PendingRollbackError
-from pgvector.sqlalchemy import Vector
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.exc import (
+    DisconnectionError,
+    OperationalError,
+    PendingRollbackError,
+    SQLAlchemyError,
+)
+from psycopg import OperationalError as DriverOperationalError
+from psycopg import errors as pg_errors
+from pgvector.psycopg import register_vector
+from pgvector.sqlalchemy import HALFVEC, Vector
 from sentence_transformers import SentenceTransformer
 from .config import Config
 import time
 
 logger = logging.getLogger(__name__)
 
+EMBEDDING_DIM = 384
+_WHITESPACE_RE = re.compile(r"\s+")
+TRANSIENT_DB_ERRORS = (
+    PendingRollbackError,
+    OperationalError,
+    DisconnectionError,
+    DriverOperationalError,
+)
+# Managed servers may refuse COPY; bulk INSERT still works there.
+COPY_UNAVAILABLE_ERRORS = (pg_errors.InsufficientPrivilege, pg_errors.FeatureNotSupported)
+HNSW_WITH = f"WITH (m = {Config.HNSW_M}, ef_construction = {Config.HNSW_EF_CONSTRUCTION})"
+
+_SEARCH_DISTANCE_FILTER = (
+    f"AND embedding_half <=> CAST(:query_embedding AS halfvec({EMBEDDING_DIM})) < :max_distance"
+)
+
+
+def _search_sql(binary_prefilter: bool, distance_filter: str) -> sa.TextClause:
+
+    if binary_prefilter:
+        return sa.text(
+            f"""
+            SELECT id, text, doc_metadata, ministry, embedding,
+                   embedding <=> CAST(:query_embedding AS vector({EMBEDDING_DIM})) as distance
+            FROM (
+                SELECT id, text, doc_metadata, ministry, embedding, embedding_half
+                FROM documents
+                WHERE ministry = :ministry
+                ORDER BY binary_quantize(embedding_half)::bit({EMBEDDING_DIM})
+                         <~> binary_quantize(CAST(:query_embedding AS halfvec({EMBEDDING_DIM})))
+                LIMIT :candidates
+            ) candidates
+            WHERE true
+            {distance_filter}
+            ORDER BY distance
+            LIMIT :limit
+        """
+        )
+    return sa.text(
+        f"""
+        SELECT id, text, doc_metadata, ministry, embedding,
+               embedding_half <=> CAST(:query_embedding AS halfvec({EMBEDDING_DIM})) as distance
+        FROM documents
+        WHERE ministry = :ministry
+        {distance_filter}
+        ORDER BY embedding_half <=> CAST(:query_embedding AS halfvec({EMBEDDING_DIM}))
+        LIMIT :limit
+    """
+    )
+
+
+# Parsed once; keyed by (binary_prefilter, has_distance_filter).
+_SQL_SEARCH = {
+    (binary, filtered): _search_sql(binary, _SEARCH_DISTANCE_FILTER if filtered else "")
+    for binary in (False, True)
+    for filtered in (False, True)
+}
+_SQL_SET_EF_SEARCH = sa.text("SELECT set_config('hnsw.ef_search', :ef_search, true)")
+_SQL_SET_ITERATIVE_SCAN = sa.text(
+    "SELECT set_config('hnsw.iterative_scan', 'strict_order', true)"
+)
+_SQL_PGVECTOR_VERSION = sa.text(
+    "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+)
+_SQL_LOAD_MINISTRIES = sa.text("SELECT ministry FROM ministry_index WHERE doc_count > 0")
+_SQL_MINISTRY_COUNT = sa.text(
+    "SELECT doc_count FROM ministry_index WHERE ministry = :ministry"
+)
+_SQL_MINISTRY_COUNTS = sa.text(
+    "SELECT ministry, doc_count FROM ministry_index WHERE doc_count > 0"
+)
+_SQL_MINISTRY_EMBEDDINGS = sa.text(
+    "SELECT id, embedding FROM documents WHERE ministry = :ministry"
+)
+_SQL_FETCH_BY_IDS = sa.text(
+    "SELECT id, text, doc_metadata, ministry FROM documents WHERE id = ANY(:ids)"
+)
+_SQL_DELETE_MINISTRY = sa.text("DELETE FROM documents WHERE ministry = :ministry")
+_SQL_DELETE_ALL = sa.text("DELETE FROM documents")
+_SQL_PING = sa.text("SELECT 1")
+_SQL_HEALTH_COUNTS = sa.text(
+    "SELECT COALESCE(SUM(doc_count), 0), COUNT(*) FILTER (WHERE doc_count > 0) "
+    "FROM ministry_index"
+)
+
 Base = declarative_base()
 
 
@@ -21,7 +122,8 @@ class Document(Base):
 
     id = sa.Column(sa.String, primary_key=True)
     text = sa.Column(sa.Text, nullable=False)
-    embedding = sa.Column(Vector(384))
+    embedding = sa.Column(Vector(EMBEDDING_DIM))
+    embedding_half = sa.Column(HALFVEC(EMBEDDING_DIM))
     doc_metadata = sa.Column(sa.JSON)
     ministry = sa.Column(sa.String, index=True)
     created_at = sa.Column(sa.DateTime, default=datetime.utcnow)
@@ -30,29 +132,276 @@ class Document(Base):
     )
 
 
-class AzureVectorStore:
-    def __init__(self):
+def _backoff(attempt: int):
+
+    # Full jitter, capped: short waits for blips, no synchronized retries.
+    time.sleep(random.uniform(0, min(8.0, 0.25 * 2**attempt)))
+
+
+def _psycopg_url(url: str) -> str:
+
+    for scheme in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(scheme):
+            return "postgresql+psycopg://" + url[len(scheme):]
+    return url
+
+
+def _register_vector_types(dbapi_connection, connection_record):
+
+    # Raises when the vector extension is missing, so a connection without
+    # adapters never reaches the pool.
+    register_vector(dbapi_connection)
+
+
+SCHEMA_VERSION = 1
+_SQL_SCHEMA_VERSION_TABLE = sa.text(
+    "CREATE TABLE IF NOT EXISTS schema_version "
+    "(version integer PRIMARY KEY, applied_at timestamp NOT NULL DEFAULT now())"
+)
+_SQL_SCHEMA_VERSION = sa.text("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+_SQL_RECORD_SCHEMA_VERSION = sa.text(
+    "INSERT INTO schema_version (version) VALUES (:version) ON CONFLICT DO NOTHING"
+)
+_SQL_REGCLASS = sa.text("SELECT to_regclass(:name)")
+
+# Per-ministry row counts kept current by statement-level triggers, so
+# startup and count lookups read |ministries| rows instead of scanning
+# documents. Transition tables allow one event per trigger, hence three.
+# Installed only when the table is created, so reruns never re-lock documents.
+_MINISTRY_INDEX_STATEMENTS = [
+    "CREATE TABLE ministry_index "
+    "(ministry text PRIMARY KEY, doc_count bigint NOT NULL DEFAULT 0)",
+    """
+    CREATE OR REPLACE FUNCTION ministry_index_sync() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO ministry_index (ministry, doc_count)
+            SELECT ministry, count(*) FROM new_rows
+            WHERE ministry IS NOT NULL GROUP BY ministry
+            ON CONFLICT (ministry) DO UPDATE
+            SET doc_count = ministry_index.doc_count + EXCLUDED.doc_count;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE ministry_index m SET doc_count = m.doc_count - d.n
+            FROM (
+                SELECT ministry, count(*) AS n FROM old_rows
+                WHERE ministry IS NOT NULL GROUP BY ministry
+            ) d
+            WHERE m.ministry = d.ministry;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    "CREATE TRIGGER documents_ministry_index_ins AFTER INSERT ON documents "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION ministry_index_sync()",
+    "CREATE TRIGGER documents_ministry_index_upd AFTER UPDATE ON documents "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION ministry_index_sync()",
+    "CREATE TRIGGER documents_ministry_index_del AFTER DELETE ON documents "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION ministry_index_sync()",
+]
+
+# Global HNSW graphs, built CONCURRENTLY so ingest keeps writing meanwhile.
+_HNSW_INDEX_STATEMENTS = {
+    "idx_documents_embedding_half_cos_hnsw": "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+    "idx_documents_embedding_half_cos_hnsw "
+    f"ON documents USING hnsw (embedding_half halfvec_cosine_ops) {HNSW_WITH}",
+}
+# 48-byte sign codes for the optional binary first stage; only built while
+# SEARCH_BINARY_PREFILTER is on, since nothing else reads it.
+_SQL_BIT_HNSW_INDEX = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_documents_embedding_bit_hnsw "
+    f"ON documents USING hnsw ((binary_quantize(embedding_half)::bit({EMBEDDING_DIM})) "
+    f"bit_hamming_ops) {HNSW_WITH}"
+)
+
+
+def create_db_engine(register_vector_types: bool = True) -> sa.engine.Engine:
+
+    if not Config.POSTGRESQL_URL:
+        raise ValueError("POSTGRESQL_URL environment variable is required")
+
+    # psycopg 3 binds parameters server-side and, with prepare_threshold,
+    # keeps the hot search statement prepared per connection (parse is
+    # skipped). force_custom_plan still plans every execution with the bound
+    # values, so `ministry = $1` can match the per-ministry partial indexes;
+    # a generic plan would silently fall back to the global graph. JIT only
+    # adds compile time to these short index lookups.
+    engine = sa.create_engine(
+        _psycopg_url(Config.POSTGRESQL_URL),
+        pool_size=10,
+        max_overflow=20,
+        pool_timeout=30,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        connect_args={
+            "application_name": "ministryDB_connection",
+            "prepare_threshold": 1,
+            "options": "-c jit=off -c plan_cache_mode=force_custom_plan",
+        },
+    )
+    if register_vector_types:
+        sa.event.listen(engine, "connect", _register_vector_types)
+    return engine
+
 
-        if not Config.POSTGRESQL_URL:
-            raise ValueError("POSTGRESQL_URL environment variable is required")
-
-        self.engine = sa.create_engine(
-            Config.POSTGRESQL_URL,
-            pool_size=5,
-            max_overflow=10,
-            pool_timeout=30,
-            pool_recycle=1800,
-            pool_pre_ping=True,
-            connect_args={"application_name": "ministryDB_connection"},
+def get_schema_version(engine: sa.engine.Engine) -> int:
+
+    with engine.connect() as conn:
+        if conn.execute(_SQL_REGCLASS, {"name": "schema_version"}).scalar() is None:
+            return 0
+        return conn.execute(_SQL_SCHEMA_VERSION).scalar()
+
+
+def create_ministry_index(engine: sa.engine.Engine, ministry: str):
+
+    # A partial HNSW graph per ministry keeps each ministry's ANN walk on its
+    # own pages. The planner can only prove `ministry = $1` implies the index
+    # predicate in a custom plan, which plan_cache_mode=force_custom_plan on
+    # the engine guarantees for the prepared search statement.
+    digest = hashlib.md5(ministry.encode("utf-8")).hexdigest()[:12]
+    index_name = f"idx_documents_hnsw_cos_{digest}"
+    ministry_literal = ministry.replace("'", "''")
+    try:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if conn.execute(_SQL_REGCLASS, {"name": index_name}).scalar() is not None:
+                return
+            conn.exec_driver_sql(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON documents "
+                f"USING hnsw (embedding_half halfvec_cosine_ops) {HNSW_WITH} "
+                f"WHERE ministry = '{ministry_literal}'"
+            )
+            logger.info(f"Built HNSW index for {ministry}")
+    except SQLAlchemyError as e:
+        logger.warning(f"Failed to create HNSW index for {ministry}: {e}")
+
+
+def create_binary_index(engine: sa.engine.Engine):
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.execute(
+            _SQL_REGCLASS, {"name": "idx_documents_embedding_bit_hnsw"}
+        ).scalar() is not None:
+            return
+        conn.exec_driver_sql(_SQL_BIT_HNSW_INDEX)
+        logger.info("Built idx_documents_embedding_bit_hnsw")
+
+
+def migrate_schema(engine: sa.engine.Engine):
+
+    with engine.begin() as conn:
+        conn.execute(sa.text("CREATE EXTENSION IF NOT EXISTS vector"))
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(_SQL_SCHEMA_VERSION_TABLE)
+    version = get_schema_version(engine)
+    if version >= SCHEMA_VERSION:
+        logger.info(f"Database schema is current (version {version})")
+        if Config.SEARCH_BINARY_PREFILTER:
+            create_binary_index(engine)
+        return
+
+    # Version 1: fp16 embedding copy (halves the bytes read per HNSW probe),
+    # the ministry_index counts table and the global cosine graphs.
+    with engine.begin() as conn:
+        conn.execute(
+            sa.text(
+                "ALTER TABLE documents ADD COLUMN IF NOT EXISTS "
+                f"embedding_half halfvec({EMBEDDING_DIM})"
+            )
         )
+        backfilled = conn.execute(
+            sa.text(
+                f"UPDATE documents SET embedding_half = embedding::halfvec({EMBEDDING_DIM}) "
+                "WHERE embedding_half IS NULL AND embedding IS NOT NULL"
+            )
+        ).rowcount
+        logger.info(f"Backfilled embedding_half for {backfilled} documents")
+
+        created = conn.execute(_SQL_REGCLASS, {"name": "ministry_index"}).scalar() is None
+        if created:
+            for statement in _MINISTRY_INDEX_STATEMENTS:
+                conn.execute(sa.text(statement))
+            # One-off backfill; the triggers keep it current from here.
+            conn.execute(
+                sa.text(
+                    "INSERT INTO ministry_index (ministry, doc_count) "
+                    "SELECT ministry, count(*) FROM documents "
+                    "WHERE ministry IS NOT NULL GROUP BY ministry"
+                )
+            )
+            logger.info("Created and backfilled ministry_index")
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index_name, statement in _HNSW_INDEX_STATEMENTS.items():
+            conn.exec_driver_sql(statement)
+            logger.info(f"Built {index_name}")
 
-        Base.metadata.create_all(self.engine)
+    if Config.SEARCH_BINARY_PREFILTER:
+        create_binary_index(engine)
 
-        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
-        self.model = SentenceTransformer(Config.EMBEDDING_MODEL)
+    with engine.begin() as conn:
+        ministries = [row[0] for row in conn.execute(_SQL_LOAD_MINISTRIES)]
+    for ministry in ministries:
+        create_ministry_index(engine, ministry)
+
+    with engine.begin() as conn:
+        conn.execute(_SQL_RECORD_SCHEMA_VERSION, {"version": SCHEMA_VERSION})
+    logger.info(f"Migrated database schema from version {version} to {SCHEMA_VERSION}")
+
+
+class AzureVectorStore:
+    def __init__(self):
+
+        self.engine = create_db_engine()
+        # Schema changes only run from scripts/setup_azure_db.py (startup.sh);
+        # serving against a half-migrated schema would fail query by query.
+        version = get_schema_version(self.engine)
+        if version < SCHEMA_VERSION:
+            raise RuntimeError(
+                f"Database schema is at version {version}, expected {SCHEMA_VERSION}; "
+                "run scripts/setup_azure_db.py"
+            )
+        self.supports_iterative_scan = self._get_pgvector_version() >= (0, 8)
+
+        self._copy_supported = True
+        self.Session = scoped_session(
+            sessionmaker(bind=self.engine, expire_on_commit=False)
+        )
+        device = Config.EMBEDDING_DEVICE
+        if device == "auto":
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model = SentenceTransformer(Config.EMBEDDING_MODEL, device=device)
+        if device.startswith("cuda"):
+            self.model.half()
+        logger.info(f"Loaded embedding model on {device}")
+        self._cached_query_embedding = lru_cache(maxsize=4096)(
+            lambda text: tuple(self.create_embedding(text))
+        )
+        # ministry -> (doc_count at load, monotonic load time, matrix and ids).
+        self._ministry_matrices: Dict[
+            str, Tuple[int, float, Optional[Tuple[np.ndarray, List[str]]]]
+        ] = {}
+        self._ministry_matrices_lock = threading.Lock()
         self.indexed_ministries = set()
         self._load_indexed_ministries()
 
+    def _get_pgvector_version(self) -> tuple:
+
+        try:
+            with self.engine.connect() as conn:
+                version = conn.execute(
+                    _SQL_PGVECTOR_VERSION
+                ).scalar()
+            return tuple(int(part) for part in version.split(".")[:2])
+        except Exception as e:
+            logger.warning(f"Could not determine pgvector version: {e}")
+            return (0, 0)
+
     def _load_indexed_ministries(self):
 
         max_retries = 3
@@ -60,9 +409,7 @@ class AzureVectorStore:
             try:
                 with self.Session() as session:
                     result = session.execute(
-                        sa.text(
-                            "SELECT DISTINCT ministry FROM documents WHERE ministry IS NOT NULL"
-                        )
+                        _SQL_LOAD_MINISTRIES
                     )
                     self.indexed_ministries = {row[0] for row in result}
                     logger.info(
@@ -74,7 +421,7 @@ class AzureVectorStore:
                     f"Attempt {attempt + 1} failed to load indexed ministries: {e}"
                 )
                 if attempt < max_retries - 1:
-                    time.sleep(2**attempt) 
+                    _backoff(attempt)
                 else:
                     logger.error("Failed to load indexed ministries after all retries")
                     self.indexed_ministries = set()
@@ -84,11 +431,34 @@ class AzureVectorStore:
         try:
             if not text or not text.strip():
                 raise ValueError("Text cannot be empty")
-            return self.model.encode(text.strip()).tolist()
+            return self.create_embeddings([text.strip()])[0].tolist()
         except Exception as e:
             logger.error(f"Error creating embedding: {e}")
             raise
 
+    def create_embeddings(self, texts: List[str]) -> np.ndarray:
+
+        try:
+            embeddings = self.model.encode(
+                texts,
+                batch_size=Config.EMBEDDING_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+            return embeddings.astype(np.float32, copy=False)
+        except Exception as e:
+            logger.error(f"Error creating embeddings for {len(texts)} texts: {e}")
+            raise
+
+    def embed_query(self, query: str) -> tuple:
+
+        # The embedding model's tokenizer is uncased, so case and whitespace
+        # variants of a question share one cache entry.
+        return self._cached_query_embedding(
+            _WHITESPACE_RE.sub(" ", query.strip().lower())
+        )
+
     def _safe_session_operation(self, operation_func, max_retries=3):
 
         for attempt in range(max_retries):
@@ -99,9 +469,9 @@ class AzureVectorStore:
                 session.commit()
                 return result
 
-            except PendingRollbackError as e:
+            except TRANSIENT_DB_ERRORS as e:
                 logger.warning(
-                    f"Transaction rollback required (attempt {attempt + 1}): {e}"
+                    f"Transient database error (attempt {attempt + 1}): {e}"
                 )
                 if session:
                     try:
@@ -111,40 +481,21 @@ class AzureVectorStore:
                         logger.error(f"Error during rollback: {rollback_error}")
 
                 if attempt < max_retries - 1:
-                    time.sleep(2**attempt)
-                    continue
-                else:
-                    raise
-
-            except SQLAlchemyError as e:
-                logger.error(f"Database error (attempt {attempt + 1}): {e}")
-                if session:
-                    try:
-                        session.rollback()
-                        session.close()
-                    except Exception as rollback_error:
-                        logger.error(f"Error during rollback: {rollback_error}")
-
-                if attempt < max_retries - 1:
-                    time.sleep(2**attempt)
+                    _backoff(attempt)
                     continue
                 else:
                     raise
 
             except Exception as e:
-                logger.error(f"Unexpected error (attempt {attempt + 1}): {e}")
+                # Integrity/data errors and bugs will fail the same way again.
+                logger.error(f"Database error: {e}")
                 if session:
                     try:
                         session.rollback()
                         session.close()
                     except Exception as rollback_error:
                         logger.error(f"Error during rollback: {rollback_error}")
-
-                if attempt < max_retries - 1:
-                    time.sleep(2**attempt)
-                    continue
-                else:
-                    raise
+                raise
 
             finally:
                 if session:
@@ -153,11 +504,107 @@ class AzureVectorStore:
                     except Exception as close_error:
                         logger.error(f"Error closing session: {close_error}")
 
+    def _copy_rows(self, session, rows) -> int:
+
+        # COPY into a transaction-scoped staging table, then upsert in one
+        # statement: one streamed payload instead of a round trip per row.
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.execute(
+                "CREATE TEMP TABLE tmp_documents "
+                "(LIKE documents INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            with cursor.copy(
+                "COPY tmp_documents (id, text, embedding, embedding_half, doc_metadata, ministry) "
+                "FROM STDIN"
+            ) as copy:
+                for doc_id, text, embedding, metadata, ministry in rows:
+                    copy.write_row(
+                        (doc_id, text, embedding, embedding, json.dumps(metadata), ministry)
+                    )
+            cursor.execute(
+                """
+                INSERT INTO documents
+                    (id, text, embedding, embedding_half, doc_metadata, ministry,
+                     created_at, updated_at)
+                SELECT id, text, embedding, embedding_half, doc_metadata, ministry,
+                       now() AT TIME ZONE 'utc', now() AT TIME ZONE 'utc'
+                FROM tmp_documents
+                ON CONFLICT (id) DO UPDATE SET
+                    text = EXCLUDED.text,
+                    embedding = EXCLUDED.embedding,
+                    embedding_half = EXCLUDED.embedding_half,
+                    doc_metadata = EXCLUDED.doc_metadata,
+                    ministry = EXCLUDED.ministry,
+                    updated_at = EXCLUDED.updated_at
+                WHERE documents.text IS DISTINCT FROM EXCLUDED.text
+                   OR documents.ministry IS DISTINCT FROM EXCLUDED.ministry
+                   OR documents.doc_metadata::jsonb IS DISTINCT FROM EXCLUDED.doc_metadata::jsonb
+                """
+            )
+            return cursor.rowcount
+        finally:
+            cursor.close()
+
+    def _insert_rows(self, session, rows) -> int:
+
+        now = datetime.utcnow()
+        stmt = pg_insert(Document).values(
+            [
+                {
+                    "id": doc_id,
+                    "text": text,
+                    "embedding": embedding,
+                    "embedding_half": embedding,
+                    "doc_metadata": metadata,
+                    "ministry": ministry,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for doc_id, text, embedding, metadata, ministry in rows
+            ]
+        )
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Document.id],
+            set_={
+                "text": excluded.text,
+                "embedding": excluded.embedding,
+                "embedding_half": excluded.embedding_half,
+                "doc_metadata": excluded.doc_metadata,
+                "ministry": excluded.ministry,
+                "updated_at": excluded.updated_at,
+            },
+            where=sa.or_(
+                Document.text.is_distinct_from(excluded.text),
+                Document.ministry.is_distinct_from(excluded.ministry),
+                sa.cast(Document.doc_metadata, JSONB).is_distinct_from(
+                    sa.cast(excluded.doc_metadata, JSONB)
+                ),
+            ),
+        )
+        return session.execute(stmt).rowcount
+
+    def _write_rows(self, rows) -> int:
+
+        if self._copy_supported:
+            try:
+                return self._safe_session_operation(
+                    lambda session: self._copy_rows(session, rows)
+                )
+            except COPY_UNAVAILABLE_ERRORS as e:
+                logger.warning(f"COPY unavailable, falling back to bulk INSERT: {e}")
+                self._copy_supported = False
+
+        return self._safe_session_operation(
+            lambda session: self._insert_rows(session, rows)
+        )
+
     def add_documents_batch(
         self,
         documents: List[Dict[str, Any]],
         ministry: str = None,
-        batch_size: int = 3,
+        batch_size: int = Config.EMBEDDING_BATCH_SIZE,
     ):
 
         if not documents:
@@ -173,94 +620,252 @@ class AzureVectorStore:
                 f"Processing batch {i//batch_size + 1}/{(len(documents) + batch_size - 1)//batch_size} ({len(batch)} documents)"
             )
 
-            def batch_operation(session):
-                added_count = 0
-                for doc in batch:
-                    text = doc.get("text", "").strip()
-                    if not text:
-                        logger.warning(
-                            f"Skipping document with empty text: {doc.get('id', 'unknown')}"
-                        )
-                        continue
-
-                    try:
-
-                        embedding = self.create_embedding(text)
-
-                        db_doc = Document(
-                            id=doc.get(
-                                "id", f"doc_{datetime.now().timestamp()}_{added_count}"
-                            ),
-                            text=text,
-                            embedding=embedding,
-                            doc_metadata=doc.get("metadata", {}),
-                            ministry=ministry
-                            or doc.get("metadata", {}).get("ministry"),
-                        )
+            valid_docs = []
+            for doc in batch:
+                text = doc.get("text", "").strip()
+                if not text:
+                    logger.warning(
+                        f"Skipping document with empty text: {doc.get('id', 'unknown')}"
+                    )
+                    continue
+                valid_docs.append((doc, text))
 
-                        
-                        session.merge(db_doc)
-                        added_count += 1
+            if not valid_docs:
+                continue
 
-                    except Exception as e:
-                        logger.error(
-                            f"Error processing document {doc.get('id', 'unknown')}: {e}"
-                        )
-                        continue
+            try:
+                embeddings = self.create_embeddings([text for _, text in valid_docs])
+            except Exception as e:
+                logger.error(f"Failed to embed batch {i//batch_size + 1}: {e}")
+                continue
 
-                return added_count
+            rows = {}
+            for (doc, text), embedding in zip(valid_docs, embeddings):
+                metadata = doc.get("metadata", {})
+                doc_ministry = ministry or metadata.get("ministry")
+                # Content-derived default id: re-ingesting the same passage
+                # hits the conflict branch instead of adding a duplicate.
+                doc_id = doc.get("id") or hashlib.blake2b(
+                    f"{doc_ministry}|{text}".encode("utf-8"), digest_size=16
+                ).hexdigest()
+                # Last occurrence wins, as with merge(); ON CONFLICT cannot
+                # touch the same id twice in one statement.
+                rows[doc_id] = (
+                    doc_id,
+                    text,
+                    embedding,
+                    metadata,
+                    doc_ministry,
+                )
 
             try:
-                batch_added = self._safe_session_operation(batch_operation)
+                batch_added = self._write_rows(list(rows.values()))
                 total_added += batch_added
                 logger.info(f"Successfully added {batch_added} documents in this batch")
 
-                time.sleep(0.1)
-
             except Exception as e:
                 logger.error(f"Failed to process batch {i//batch_size + 1}: {e}")
                 continue
 
-        if ministry and total_added > 0:
-            self.indexed_ministries.add(ministry)
+        if total_added > 0:
+            self._invalidate_ministry_matrix(ministry)
+
+        if ministry and total_added > 0 and ministry not in self.indexed_ministries:
+            create_ministry_index(self.engine, ministry)
+            self._load_indexed_ministries()
 
         logger.info(
             f"Successfully added {total_added} total documents for ministry: {ministry}"
         )
         return total_added
 
-    def add_documents(self, documents: List[Dict[str, Any]], ministry: str = None):
+    def add_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        ministry: str = None,
+        batch_size: int = Config.EMBEDDING_BATCH_SIZE,
+    ):
+
+        return self.add_documents_batch(documents, ministry, batch_size=batch_size)
+
+    def _get_ministry_matrix(
+        self, ministry: str
+    ) -> Optional[Tuple[np.ndarray, List[str]]]:
+
+        try:
+            doc_count = self._safe_session_operation(
+                lambda session: session.execute(
+                    _SQL_MINISTRY_COUNT, {"ministry": ministry}
+                ).scalar()
+                or 0
+            )
+        except Exception as e:
+            logger.warning(f"Could not read document count for {ministry}: {e}")
+            return None
+
+        # Ingest jobs write from other processes, so a cached matrix is only
+        # reused while ministry_index still reports the row count it was loaded
+        # at (catching inserts and deletes) and it is younger than the TTL
+        # (bounding in-place re-embeds, which leave the count unchanged).
+        with self._ministry_matrices_lock:
+            cached = self._ministry_matrices.get(ministry)
+        if cached is not None:
+            cached_count, loaded_at, matrix = cached
+            if (
+                cached_count == doc_count
+                and time.monotonic() - loaded_at < Config.CLIENT_SEARCH_MATRIX_TTL
+            ):
+                return matrix
+
+        def load_operation(session):
+            result = session.execute(
+                _SQL_MINISTRY_EMBEDDINGS,
+                {"ministry": ministry},
+            )
+            ids, vectors = [], []
+            for row in result:
+                ids.append(row.id)
+                vectors.append(row.embedding)
+            if not ids:
+                return None
+            return np.ascontiguousarray(np.vstack(vectors), dtype=np.float32), ids
+
+        matrix = None
+        if doc_count and doc_count <= Config.CLIENT_SEARCH_MAX_ROWS:
+            try:
+                matrix = self._safe_session_operation(load_operation)
+            except Exception as e:
+                logger.warning(f"Could not load embedding matrix for {ministry}: {e}")
+                return None
+
+        with self._ministry_matrices_lock:
+            self._ministry_matrices[ministry] = (doc_count, time.monotonic(), matrix)
+        if matrix is not None:
+            logger.info(f"Cached {len(matrix[1])} embeddings for {ministry}")
+        return matrix
 
-        return self.add_documents_batch(documents, ministry, batch_size=10)
+    def _invalidate_ministry_matrix(self, ministry: str = None):
+
+        with self._ministry_matrices_lock:
+            if ministry:
+                self._ministry_matrices.pop(ministry, None)
+            else:
+                self._ministry_matrices.clear()
+
+    def _search_ministry_matrix(
+        self,
+        query: str,
+        ministry: str,
+        n_results: int,
+        max_distance: Optional[float],
+    ) -> Optional[List[Dict[str, Any]]]:
+
+        cached = self._get_ministry_matrix(ministry)
+        if cached is None:
+            return None
+        matrix, ids = cached
+
+        # Embeddings are unit length, so one matrix-vector product gives every
+        # cosine similarity.
+        query_embedding = np.asarray(self.embed_query(query), dtype=np.float32)
+        scores = matrix @ query_embedding
+        k = min(n_results, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        distances = 1.0 - scores[top]
+        if max_distance is not None:
+            keep = distances < max_distance
+            top, distances = top[keep], distances[keep]
+        if len(top) == 0:
+            return []
+
+        top_ids = [ids[idx] for idx in top]
+
+        def fetch_operation(session):
+            result = session.execute(
+                _SQL_FETCH_BY_IDS,
+                {"ids": top_ids},
+            )
+            return {row.id: row for row in result}
+
+        rows = self._safe_session_operation(fetch_operation)
+        documents = []
+        for idx, doc_id, distance in zip(top, top_ids, distances):
+            row = rows.get(doc_id)
+            if row is None:
+                continue
+            documents.append(
+                {
+                    "id": row.id,
+                    "text": row.text,
+                    "metadata": row.doc_metadata or {},
+                    "ministry": row.ministry,
+                    "embedding": matrix[idx],
+                    "distance": float(distance),
+                    "relevance_score": max(0, 1.0 - float(distance)),
+                }
+            )
+        return documents
 
     def search_by_text(
-        self, query: str, ministry: str, n_results: int = 10
+        self,
+        query: str,
+        ministry: str,
+        n_results: int = 10,
+        max_distance: Optional[float] = None,
+        raise_on_error: bool = False,
     ) -> List[Dict[str, Any]]:
 
         if not query or not query.strip():
             logger.warning("Empty query provided")
             return []
 
+        if max_distance is None:
+            max_distance = Config.SEARCH_MAX_DISTANCE
+
+        if Config.CLIENT_SEARCH_MAX_ROWS > 0:
+            try:
+                documents = self._search_ministry_matrix(
+                    query.strip(), ministry, n_results, max_distance
+                )
+                if documents is not None:
+                    logger.info(
+                        f"Found {len(documents)} relevant documents for query in {ministry} (in-process)"
+                    )
+                    return documents
+            except Exception as e:
+                logger.warning(f"In-process search failed, using the index: {e}")
+
         def search_operation(session):
-            query_embedding = self.create_embedding(query.strip())
+            query_embedding = np.asarray(
+                self.embed_query(query.strip()), dtype=np.float32
+            )
 
-            stmt = sa.text(
-                """
-                SELECT id, text, doc_metadata, ministry, 
-                       embedding <-> :query_embedding as distance
-                FROM documents 
-                WHERE ministry = :ministry
-                ORDER BY embedding <-> :query_embedding
-                LIMIT :limit
-            """
+            candidates = (
+                n_results * Config.BINARY_CANDIDATE_FACTOR
+                if Config.SEARCH_BINARY_PREFILTER
+                else 0
+            )
+
+            # Widen the HNSW candidate list with k, and on pgvector >= 0.8 keep
+            # scanning until enough rows survive the ministry filter.
+            session.execute(
+                _SQL_SET_EF_SEARCH,
+                {"ef_search": str(min(1000, max(40, 8 * n_results, candidates)))},
             )
+            if self.supports_iterative_scan:
+                session.execute(_SQL_SET_ITERATIVE_SCAN)
+
+            stmt = _SQL_SEARCH[(Config.SEARCH_BINARY_PREFILTER, max_distance is not None)]
 
             result = session.execute(
                 stmt,
                 {
-                    "query_embedding": str(query_embedding),
+                    "query_embedding": query_embedding,
                     "ministry": ministry,
                     "limit": n_results,
+                    "candidates": candidates,
+                    "max_distance": max_distance,
                 },
             )
 
@@ -272,6 +877,7 @@ class AzureVectorStore:
                         "text": row.text,
                         "metadata": row.doc_metadata or {},
                         "ministry": row.ministry,
+                        "embedding": row.embedding,
                         "distance": float(row.distance),
                         "relevance_score": max(0, 1.0 - float(row.distance)),
                     }
@@ -287,6 +893,8 @@ class AzureVectorStore:
             return documents
         except Exception as e:
             logger.error(f"Error searching documents: {e}")
+            if raise_on_error:
+                raise
             return []
 
     def is_ministry_indexed(self, ministry: str) -> bool:
@@ -297,10 +905,10 @@ class AzureVectorStore:
 
         def count_operation(session):
             result = session.execute(
-                sa.text("SELECT COUNT(*) FROM documents WHERE ministry = :ministry"),
+                _SQL_MINISTRY_COUNT,
                 {"ministry": ministry},
             )
-            return result.scalar()
+            return result.scalar() or 0
 
         try:
             return self._safe_session_operation(count_operation)
@@ -308,18 +916,33 @@ class AzureVectorStore:
             logger.error(f"Error getting document count for {ministry}: {e}")
             return 0
 
+    def get_ministry_counts(self) -> Dict[str, int]:
+
+        def counts_operation(session):
+            result = session.execute(
+                _SQL_MINISTRY_COUNTS
+            )
+            return {row[0]: row[1] for row in result}
+
+        try:
+            return self._safe_session_operation(counts_operation)
+        except Exception as e:
+            logger.error(f"Error getting ministry document counts: {e}")
+            return {}
+
     def clear_ministry_documents(self, ministry: str):
 
         def clear_operation(session):
             result = session.execute(
-                sa.text("DELETE FROM documents WHERE ministry = :ministry"),
+                _SQL_DELETE_MINISTRY,
                 {"ministry": ministry},
             )
             return result.rowcount
 
         try:
             deleted_count = self._safe_session_operation(clear_operation)
-            self.indexed_ministries.discard(ministry)
+            self._invalidate_ministry_matrix(ministry)
+            self._load_indexed_ministries()
             logger.info(f"Cleared {deleted_count} documents for ministry: {ministry}")
         except Exception as e:
             logger.error(f"Error clearing documents for {ministry}: {e}")
@@ -328,12 +951,13 @@ class AzureVectorStore:
     def clear_all(self):
 
         def clear_all_operation(session):
-            result = session.execute(sa.text("DELETE FROM documents"))
+            result = session.execute(_SQL_DELETE_ALL)
             return result.rowcount
 
         try:
             deleted_count = self._safe_session_operation(clear_all_operation)
-            self.indexed_ministries.clear()
+            self._invalidate_ministry_matrix()
+            self._load_indexed_ministries()
             logger.info(f"Cleared {deleted_count} total documents from vector store")
         except Exception as e:
             logger.error(f"Error clearing all documents: {e}")
@@ -343,18 +967,11 @@ class AzureVectorStore:
 
         def health_operation(session):
 
-            result = session.execute(sa.text("SELECT 1"))
+            result = session.execute(_SQL_PING)
             connectivity = result.scalar() == 1
 
-            result = session.execute(sa.text("SELECT COUNT(*) FROM documents"))
-            doc_count = result.scalar()
-
-            result = session.execute(
-                sa.text(
-                    "SELECT COUNT(DISTINCT ministry) FROM documents WHERE ministry IS NOT NULL"
-                )
-            )
-            ministry_count = result.scalar()
+            result = session.execute(_SQL_HEALTH_COUNTS)
+            doc_count, ministry_count = result.one()
 
             return {
                 "connectivity": connectivity,
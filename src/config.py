@@ -1,5 +1,6 @@
 import os
 import logging
+from functools import lru_cache
 from dotenv import load_dotenv
 
 
@@ -7,6 +8,13 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+_LEVEL_MAP = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
 
 class Config:
 
@@ -16,11 +24,46 @@ class Config:
 
     AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
     AZURE_STORAGE_CONTAINER = os.getenv("AZURE_STORAGE_CONTAINER", "MinistryQnA")
+    # Blocks staged in parallel per blob; 8-16 is the usual ceiling before the
+    # account starts throttling.
+    BLOB_MAX_CONCURRENCY = int(os.getenv("BLOB_MAX_CONCURRENCY", "8"))
+    BLOB_MAX_BLOCK_SIZE = 8 * 1024 * 1024
+    BLOB_CONNECTION_TIMEOUT = 20
+    BLOB_READ_TIMEOUT = 120
 
     ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
     EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_BATCH_SIZE = 64
+    EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "auto")
+
+    HNSW_M = 16
+    HNSW_EF_CONSTRUCTION = 64
+    # Two-stage search: Hamming distance over 1-bit codes picks
+    # BINARY_CANDIDATE_FACTOR * k rows, full-precision cosine orders them.
+    # The bit index it needs is built by scripts/setup_azure_db.py while on.
+    SEARCH_BINARY_PREFILTER = os.getenv("SEARCH_BINARY_PREFILTER", "false").lower() == "true"
+    BINARY_CANDIDATE_FACTOR = 10
+    # Ministries with at most this many passages are searched exactly from an
+    # in-process float32 matrix; 0 disables. ~1.5 KB of RAM per passage.
+    # The matrix is a snapshot: writes from other processes show up once the
+    # ministry's row count changes or CLIENT_SEARCH_MATRIX_TTL seconds pass,
+    # so an in-place re-embed can be served stale for up to the TTL.
+    CLIENT_SEARCH_MAX_ROWS = int(os.getenv("CLIENT_SEARCH_MAX_ROWS", "0"))
+    CLIENT_SEARCH_MATRIX_TTL = int(os.getenv("CLIENT_SEARCH_MATRIX_TTL", "600"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+    LLM_REQUEST_TIMEOUT = 60
+    RERANKER_MODEL = os.getenv("RERANKER_MODEL", "BAAI/bge-reranker-base")
+    RERANK_CANDIDATES = 30
+    RERANK_TOP_K = 5
+    # Cosine distance (1 - similarity); 0.6 is a cosine similarity of 0.4.
+    MAX_RELEVANT_DISTANCE = float(os.getenv("MAX_RELEVANT_DISTANCE", "0.6"))
+    SEARCH_MAX_DISTANCE = (
+        float(os.getenv("SEARCH_MAX_DISTANCE"))
+        if os.getenv("SEARCH_MAX_DISTANCE")
+        else None
+    )
 
     SANSAD_API_URL = "https://sansad.in/qetFile/loksabhaquestions"
     PDF_BASE_URL = "https://sansad.in"
@@ -34,7 +77,10 @@ class Config:
     RATE_LIMIT_DELAY = 1.0
     TIMEOUT = 30
 
-    MINISTRIES = [
+    INGEST_WORKERS = 8
+    INGEST_FLUSH_CHUNKS = 256
+
+    MINISTRIES = (
         "Ministry of Agriculture and Farmers Welfare",
         "Ministry of Chemicals and Fertilizers",
         "Ministry of Civil Aviation",
@@ -87,7 +133,9 @@ class Config:
         "Ministry of Youth Affairs and Sports",
         "Prime Minister's Office",
         "NITI Aayog",
-    ]
+    )
+    # Use for membership checks.
+    MINISTRIES_SET = frozenset(MINISTRIES)
 
     @classmethod
     def validate_environment(cls):
@@ -109,12 +157,7 @@ class Config:
         return True
 
     @classmethod
+    @lru_cache(maxsize=None)
     def get_log_level(cls):
 
-        level_map = {
-            "DEBUG": logging.DEBUG,
-            "INFO": logging.INFO,
-            "WARNING": logging.WARNING,
-            "ERROR": logging.ERROR,
-        }
-        return level_map.get(cls.LOG_LEVEL.upper(), logging.INFO)
+        return _LEVEL_MAP.get(cls.LOG_LEVEL.upper(), logging.INFO)
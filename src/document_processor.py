@@ -1,12 +1,44 @@
 import logging
+import os
 import re
-from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator
 from pathlib import Path
-from pypdf import PdfReader
+import fitz
 from .azure_storage import AzureBlobStorage
 
 logger = logging.getLogger(__name__)
 
+_WS = re.compile(r"\s+")
+# Page markers and disallowed characters both become a space in one pass;
+# the final whitespace collapse absorbs them.
+_STRIP = re.compile(r"---\s*Page\s+\d+\s*---|[^\w\s.,!?()-]")
+# Chunks are fixed windows of words. 170 words is what the old 1000-character
+# chunks held on this corpus; at ~1.4 wordpieces per word (names, figures) that
+# keeps all-MiniLM-L6-v2 under its 256-wordpiece cap, where 200 words overran
+# and the tail was silently truncated. Overlap stays at the old 20%.
+CHUNK_WORDS = 170
+CHUNK_OVERLAP_WORDS = 34
+# Content-stream bytes per extracted character above which a page is mostly
+# vector graphics; logged at debug level so slow documents can be traced.
+GRAPHICS_RATIO_WARNING = 1000
+
+
+def _page_text(page: fitz.Page, page_num: int) -> str:
+
+    text = page.get_text("text")
+    # read_contents() decompresses the whole content stream, so it is only
+    # paid for when someone is looking at debug output.
+    if not logger.isEnabledFor(logging.DEBUG):
+        return text
+    stream_size = len(page.read_contents())
+    if stream_size > GRAPHICS_RATIO_WARNING * max(len(text), 1):
+        logger.debug(
+            f"Page {page_num} is graphics-heavy: {stream_size} content bytes "
+            f"for {len(text)} characters of text"
+        )
+    return text
+
 
 class DocumentProcessor:
     def __init__(self):
@@ -16,22 +48,21 @@ class DocumentProcessor:
     def extract_text_from_pdf(self, pdf_path: str) -> str:
 
         try:
-            with open(pdf_path, "rb") as file:
-                pdf_reader = PdfReader(file)
-                text = ""
+            with fitz.open(pdf_path) as pdf_document:
+                parts = []
 
-                for page_num, page in enumerate(pdf_reader.pages, 1):
+                for page_num, page in enumerate(pdf_document, 1):
                     try:
-                        page_text = page.extract_text()
+                        page_text = _page_text(page, page_num)
                         if page_text:
-                            text += f"\n--- Page {page_num} ---\n{page_text}"
+                            parts.append(f"\n--- Page {page_num} ---\n{page_text}")
                     except Exception as e:
                         logger.warning(
                             f"Error extracting text from page {page_num}: {e}"
                         )
                         continue
 
-                return text.strip()
+                return "".join(parts).strip()
 
         except Exception as e:
             logger.error(f"Error extracting text from PDF {pdf_path}: {e}")
@@ -42,98 +73,107 @@ class DocumentProcessor:
         if not text:
             return ""
 
-        text = re.sub(r"\s+", " ", text)
-
-        text = re.sub(r"--- Page \d+ ---", "", text)
-
-        text = re.sub(r"[^\w\s.,!?()-]", " ", text)
-
-        text = re.sub(r"\s+", " ", text)
-
-        return text.strip()
+        return _WS.sub(" ", _STRIP.sub(" ", text)).strip()
 
     def chunk_text(
-        self, text: str, chunk_size: int = 1000, overlap: int = 200
+        self, text: str, chunk_size: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP_WORDS
     ) -> List[str]:
 
         if not text:
             return []
 
-        sentences = re.split(r"[.!?]+", text)
+        return list(self._iter_chunks([text], chunk_size, overlap))
 
-        chunks = []
-        current_chunk = ""
+    def _iter_page_texts(self, pdf_document: fitz.Document) -> Iterator[str]:
 
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
+        for page_num, page in enumerate(pdf_document, 1):
+            try:
+                page_text = self.clean_text(_page_text(page, page_num))
+            except Exception as e:
+                logger.warning(f"Error extracting text from page {page_num}: {e}")
                 continue
-
-            if len(current_chunk) + len(sentence) > chunk_size:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-
-                    if overlap > 0 and len(current_chunk) > overlap:
-                        current_chunk = current_chunk[-overlap:] + " " + sentence
-                    else:
-                        current_chunk = sentence
-                else:
-                    current_chunk = sentence
-            else:
-                current_chunk += " " + sentence if current_chunk else sentence
-
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
-
-        return chunks
+            if page_text:
+                yield page_text
+
+    def _iter_chunks(
+        self,
+        texts: Iterable[str],
+        chunk_size: int = CHUNK_WORDS,
+        overlap: int = CHUNK_OVERLAP_WORDS,
+    ) -> Iterator[str]:
+
+        stride = max(1, chunk_size - overlap)
+        window = []
+        emitted = False
+
+        for text in texts:
+            window.extend(text.split())
+            while len(window) >= chunk_size:
+                yield " ".join(window[:chunk_size])
+                del window[:stride]
+                emitted = True
+
+        # After a full window the buffer keeps chunk_size - stride words that
+        # were already emitted; only a longer tail holds anything new.
+        if window and (not emitted or len(window) > chunk_size - stride):
+            yield " ".join(window)
 
     def process_pdf_from_blob(
         self, blob_name: str, ministry: str
-    ) -> List[Dict[str, Any]]:
+    ) -> Iterator[Dict[str, Any]]:
 
         try:
-
-            temp_path = f"data/pdf_cache/{blob_name.split('/')[-1]}"
-
-            if not self.storage.download_pdf(blob_name, temp_path):
+            pdf_bytes = self.storage.download_pdf_to_bytes(blob_name)
+            if pdf_bytes is None:
                 logger.error(f"Failed to download PDF: {blob_name}")
-                return []
-
-            raw_text = self.extract_text_from_pdf(temp_path)
-            if not raw_text:
+                return
+
+            # The raw PDF bytes stay resident for the whole document (fitz reads
+            # from that buffer); the extracted text and chunks are streamed, so
+            # only one page of text and one chunk are held on top of it.
+            chunk_count = 0
+            with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+                for i, chunk in enumerate(
+                    self._iter_chunks(self._iter_page_texts(pdf_document))
+                ):
+                    chunk_count = i + 1
+                    yield {
+                        "id": f"{blob_name.replace('/', '_')}_chunk_{i}",
+                        "text": chunk,
+                        "metadata": {
+                            "source": blob_name,
+                            "ministry": ministry,
+                            "chunk_index": i,
+                        },
+                    }
+
+            if chunk_count:
+                logger.info(f"Processed {blob_name}: {chunk_count} chunks created")
+            else:
                 logger.warning(f"No text extracted from PDF: {blob_name}")
-                return []
-
-            cleaned_text = self.clean_text(raw_text)
 
-            chunks = self.chunk_text(cleaned_text)
-
-            documents = []
-            for i, chunk in enumerate(chunks):
-                doc = {
-                    "id": f"{blob_name.replace('/', '_')}_chunk_{i}",
-                    "text": chunk,
-                    "metadata": {
-                        "source": blob_name,
-                        "ministry": ministry,
-                        "chunk_index": i,
-                        "total_chunks": len(chunks),
-                    },
-                }
-                documents.append(doc)
-
-            logger.info(f"Processed {blob_name}: {len(documents)} chunks created")
-
-            try:
-                Path(temp_path).unlink()
-            except Exception as e:
-                logger.warning(f"Failed to cleanup temp file {temp_path}: {e}")
+        except Exception as e:
+            logger.error(f"Error processing PDF {blob_name}: {e}")
 
-            return documents
+    def process_many(
+        self, jobs: List[tuple], max_workers: int = None
+    ) -> List[Dict[str, Any]]:
 
+        # Parsing and cleaning are CPU-bound, so blobs are spread across
+        # processes; each worker builds its own processor and storage client.
+        documents = []
+        try:
+            with ProcessPoolExecutor(
+                max_workers=max_workers or os.cpu_count(),
+                initializer=_init_worker,
+            ) as executor:
+                for blob_documents in executor.map(_process_one, jobs):
+                    documents.extend(blob_documents)
         except Exception as e:
-            logger.error(f"Error processing PDF {blob_name}: {e}")
-            return []
+            logger.error(f"Error processing PDFs in parallel: {e}")
+
+        logger.info(f"Processed {len(jobs)} PDFs: {len(documents)} chunks created")
+        return documents
 
     def process_local_pdf(self, pdf_path: str, ministry: str) -> List[Dict[str, Any]]:
 
@@ -142,12 +182,8 @@ class DocumentProcessor:
                 logger.error(f"PDF file not found: {pdf_path}")
                 return []
 
-            raw_text = self.extract_text_from_pdf(pdf_path)
-            if not raw_text:
-                return []
-
-            cleaned_text = self.clean_text(raw_text)
-            chunks = self.chunk_text(cleaned_text)
+            with fitz.open(pdf_path) as pdf_document:
+                chunks = list(self._iter_chunks(self._iter_page_texts(pdf_document)))
 
             documents = []
             filename = Path(pdf_path).name
@@ -171,18 +207,32 @@ class DocumentProcessor:
             logger.error(f"Error processing local PDF {pdf_path}: {e}")
             return []
     
-    def get_pdf_reader_from_bytes(self, pdf_bytes) -> PdfReader:
-        from io import BytesIO
-        return PdfReader(BytesIO(pdf_bytes))
+    def get_pdf_reader_from_bytes(self, pdf_bytes) -> fitz.Document:
+        return fitz.open(stream=pdf_bytes, filetype="pdf")
 
-    def extract_text_from_pdf_reader(self, pdf_reader: PdfReader) -> str:
-        text = ""
-        for page in pdf_reader.pages:
+    def extract_text_from_pdf_reader(self, pdf_reader: fitz.Document) -> str:
+        parts = []
+        for page_num, page in enumerate(pdf_reader, 1):
             try:
-                page_text = page.extract_text()
+                page_text = _page_text(page, page_num)
                 if page_text:
-                    text += page_text + "\n"
+                    parts.append(page_text)
+                    parts.append("\n")
             except:
                 continue
-        return text
+        return "".join(parts)
+
+
+_worker_processor = None
+
+
+def _init_worker():
+
+    global _worker_processor
+    _worker_processor = DocumentProcessor()
+
+
+def _process_one(job: tuple) -> List[Dict[str, Any]]:
 
+    blob_name, ministry = job
+    return list(_worker_processor.process_pdf_from_blob(blob_name, ministry))
@@ -1,13 +1,147 @@
 import logging
+import re
 import google.generativeai as genai
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import threading
+from functools import lru_cache
 from .config import Config
 
+try:
+    # Optional: RE2 matches the indicator alternation with a DFA, no backtracking.
+    import re2 as _indicator_re
+except ImportError:
+    _indicator_re = re
+
 
 logger = logging.getLogger(__name__)
 
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.8,
+    "top_k": 40,
+    "max_output_tokens": 3000,
+}
+
+SAFETY_SETTINGS = [
+    {
+        "category": "HARM_CATEGORY_HARASSMENT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE",
+    },
+    {
+        "category": "HARM_CATEGORY_HATE_SPEECH",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE",
+    },
+    {
+        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE",
+    },
+    {
+        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE",
+    },
+]
+
+IRRELEVANCE_INDICATORS = [
+    "unable to answer this question as it is not relevant to the ministry's affairs",
+    "not relevant to the ministry's functions",
+    "does not fall under the purview of this ministry",
+    "outside the scope of this ministry",
+    "not within the jurisdiction of this ministry",
+    "not relevant to",
+    "outside the scope",
+    "not related to parliamentary",
+    "not within the jurisdiction",
+    "unrelated to government",
+    "cannot answer this question as it is not relevant",
+]
+# Runs of non-empty lines, i.e. the blocks app.py joins with blank lines.
+_CONTEXT_BLOCK_RE = re.compile(r"[^\n]+(?:\n(?!\n)[^\n]+)*")
+
+# Inline (?i) works for both re and re2 and spares a lowered copy of the text.
+_IRRELEVANCE_RE = _indicator_re.compile(
+    "(?i)" + "|".join(_indicator_re.escape(s) for s in IRRELEVANCE_INDICATORS)
+)
+
+
+def _render_prompt_template(ministry: Optional[str]) -> str:
+
+    # Ministry text is baked in; braces are doubled so only the two call-time
+    # placeholders remain for str.format.
+    escaped = ministry.replace("{", "{{").replace("}", "}}") if ministry else None
+    name = escaped or "Indian Parliament"
+    subject = escaped or "parliamentary"
+    return f"""
+You are an official representative of the {name} in the Indian Parliament.
+
+
+USER QUESTION:
+{{question}}
+
+
+CONTEXT FROM PARLIAMENTARY RECORDS:
+{{context_text}}
+
+
+INSTRUCTIONS:
+1. RELEVANCE CHECK:
+   * Answer only if the question relates to {subject}'s functions, policies, or responsibilities.
+   * If the question is off-topic, respond: "I am unable to answer this question as it is not relevant to the ministry's affairs."
+
+
+2. USING CONTEXT:
+   * Base your answer primarily on the parliamentary records provided in the context.
+   * If the context contains relevant information, cite it specifically (e.g., "According to the record from [date/session]...").
+   * If the context is insufficient but the question is valid, use your knowledge of Indian government policies and programs.
+   * If using general knowledge, clearly state: "Based on general information about the ministry's policies..."
+
+
+3. ANSWER FORMAT:
+   * Begin with a formal answer to the question.
+   * Include specific facts, figures, and dates from the context when available.
+   * Organize information logically with clear sections.
+   * End with any relevant initiatives or future plans mentioned in the context.
+
+
+4. TONE:
+   * Formal and professional
+   * Factual and precise
+   * Solution-oriented
+
+
+Generate a comprehensive, accurate response based on these instructions.
+Do not answer irrelevant questions like what's the climate, etc.
+"""
+
+
+_PROMPT_TEMPLATES = {
+    ministry: _render_prompt_template(ministry) for ministry in (None, *Config.MINISTRIES)
+}
+
+
+# Keyed on the rendered field values, not doc ids: chunk indexes repeat across
+# documents, and a re-asked question with the same context skips the rebuild.
+@lru_cache(maxsize=256)
+def _build_enhanced_prompt(question: str, ministry: Optional[str], sources: tuple) -> str:
+
+    context_parts = []
+    for i, (date, session, source, ministry_info, page, text) in enumerate(sources, 1):
+        context_parts.append(
+            f"""SOURCE {i}:
+Date: {date}
+Session: {session}
+Source: {source}
+Ministry: {ministry_info}
+Page: {page}
+Content: {text}
+"""
+        )
+
+    context_text = "\n---\n".join(context_parts)
+
+    template = _PROMPT_TEMPLATES.get(ministry) or _render_prompt_template(ministry)
+    return template.format(question=question, context_text=context_text)
+
 
 class LLMClient:
     def __init__(self):
@@ -19,7 +153,15 @@ class LLMClient:
 
             self.model = genai.GenerativeModel("gemini-2.0-flash-exp")
 
-            self.executor = ThreadPoolExecutor(max_workers=2)
+            # The SDK's async client is bound to the loop it first runs on, so
+            # every async Gemini call goes through one long-lived loop; callers
+            # on any other loop await it through run_coroutine_threadsafe.
+            self._loop = asyncio.new_event_loop()
+            self._loop_thread = threading.Thread(
+                target=self._loop.run_forever, name="gemini-event-loop", daemon=True
+            )
+            self._loop_thread.start()
+            self._semaphore = None
 
             logger.info("Successfully initialized Gemini LLM client")
 
@@ -48,6 +190,45 @@ class LLMClient:
             logger.error(f"Error generating answer: {e}")
             return self._get_error_response()
 
+    def generate_answer_stream(
+        self, question: str, context: str, ministry: str = None
+    ) -> Iterator[str]:
+        try:
+            context_docs = self._parse_context_string(context)
+
+            if context_docs:
+                prompt = self._construct_enhanced_prompt(
+                    question, context_docs, ministry
+                )
+            else:
+                prompt = self._construct_simple_prompt(question, ministry)
+
+            streamed = []
+            for chunk in self._call_gemini_api(prompt, stream=True):
+                text = chunk.text
+                if text:
+                    streamed.append(text)
+                    yield text
+
+            if not streamed:
+                logger.warning("Empty response from Gemini API")
+                yield "I apologize, but I couldn't generate a meaningful response. Please try rephrasing your question."
+                return
+
+            answer = "".join(streamed)
+            if context_docs and not self._is_irrelevant_response(answer):
+                citations = self._build_citations(context_docs)
+                if citations:
+                    yield citations
+
+            logger.info(
+                f"Streamed response for question about {ministry or 'general topic'}"
+            )
+
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            yield self._get_error_response()
+
     def generate_response_with_docs(
         self, question: str, context_docs: List[Dict[str, Any]], ministry: str = None
     ) -> str:
@@ -61,13 +242,9 @@ class LLMClient:
         self, question: str, context: List[Dict[str, Any]], ministry: str
     ) -> str:
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            response = loop.run_until_complete(
+            return asyncio.run(
                 self.generate_response_async(question, context, ministry)
             )
-            loop.close()
-            return response
         except Exception as e:
             logger.error(f"Error in synchronous response generation: {e}")
             return self._get_error_response()
@@ -78,9 +255,10 @@ class LLMClient:
         try:
             prompt = self._construct_enhanced_prompt(question, context, ministry)
 
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                self.executor, self._call_gemini_api, prompt
+            response = await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(
+                    self._call_gemini_api_async(prompt), self._loop
+                )
             )
 
             if not response or not response.text:
@@ -96,20 +274,50 @@ class LLMClient:
             logger.error(f"Error in async response generation: {e}")
             return self._get_error_response()
 
+    def generate_many(
+        self, requests: List[Tuple[str, List[Dict[str, Any]], str]]
+    ) -> List[str]:
+        try:
+            return asyncio.run(self.generate_many_async(requests))
+        except Exception as e:
+            logger.error(f"Error in batch response generation: {e}")
+            return [self._get_error_response() for _ in requests]
+
+    async def generate_many_async(
+        self, requests: List[Tuple[str, List[Dict[str, Any]], str]]
+    ) -> List[str]:
+
+        async def answer(question, context, ministry):
+            try:
+                return await asyncio.wait_for(
+                    self.generate_response_async(question, context, ministry),
+                    timeout=Config.LLM_REQUEST_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                logger.error(
+                    f"Gemini request timed out after {Config.LLM_REQUEST_TIMEOUT}s"
+                )
+                return self._get_error_response()
+
+        # Requests overlap on the shared loop, so a batch takes about as long as
+        # its slowest answer rather than the sum of all of them.
+        return await asyncio.gather(
+            *(answer(question, context, ministry) for question, context, ministry in requests)
+        )
+
     def _parse_context_string(self, context: str) -> List[Dict[str, Any]]:
         if not context or not context.strip():
             return []
 
-        chunks = context.split("\n\n")
-
         parsed_docs = []
-        for i, chunk in enumerate(chunks):
-            if chunk.strip():
+        for match in _CONTEXT_BLOCK_RE.finditer(context):
+            text = match.group().strip()
+            if text:
                 parsed_docs.append(
                     {
-                        "text": chunk.strip(),
+                        "text": text,
                         "metadata": {
-                            "chunk_index": i,
+                            "chunk_index": len(parsed_docs),
                             "source": "parliamentary_document",
                         },
                     }
@@ -142,7 +350,22 @@ class LLMClient:
     def _generate_simple_response(self, question: str, ministry: str = None) -> str:
 
         try:
-            simple_prompt = f"""
+            simple_prompt = self._construct_simple_prompt(question, ministry)
+
+            response = self._call_gemini_api(simple_prompt)
+
+            if response and response.text:
+                return response.text.strip()
+            else:
+                return "I apologize, but I couldn't generate a response. Please try rephrasing your question."
+
+        except Exception as e:
+            logger.error(f"Error in simple response generation: {e}")
+            return self._get_error_response()
+
+    def _construct_simple_prompt(self, question: str, ministry: str = None) -> str:
+
+        return f"""
 You are an AI assistant representing the {ministry or 'Indian Parliament'}.
 
 
@@ -161,136 +384,67 @@ Keep the response:
 If you cannot provide accurate information, clearly state the limitations.
 """
 
-            response = self._call_gemini_api(simple_prompt)
-
-            if response and response.text:
-                return response.text.strip()
-            else:
-                return "I apologize, but I couldn't generate a response. Please try rephrasing your question."
-
-        except Exception as e:
-            logger.error(f"Error in simple response generation: {e}")
-            return self._get_error_response()
-
     def _construct_enhanced_prompt(
         self, question: str, context_docs: List[Dict[str, Any]], ministry: str = None
     ) -> str:
 
         try:
-            context_parts = []
+            sources = []
 
-            for i, doc in enumerate(context_docs[:5], 1):  # Use top 5 documents
+            for doc in context_docs[:5]:  # Use top 5 documents
                 text = doc.get("text", "").strip()
-                metadata = doc.get("metadata", {})
-
-                date = metadata.get("date", "Unknown date")
-                session = metadata.get("session", "4")
-                source = metadata.get(
-                    "filename", metadata.get("source", "Unknown source")
+                if not text:
+                    continue
+
+                md_get = (doc.get("metadata") or {}).get
+                sources.append(
+                    (
+                        str(md_get("date", "Unknown date")),
+                        str(md_get("session", "4")),
+                        str(md_get("filename") or md_get("source") or "Unknown source"),
+                        str(md_get("ministry", ministry or "Unknown Ministry")),
+                        str(md_get("page", "Unknown page")),
+                        text,
+                    )
                 )
-                ministry_info = metadata.get("ministry", ministry or "Unknown Ministry")
-                page = metadata.get("page", "Unknown page")
-
-                if text:
-                    context_entry = f"""SOURCE {i}:
-Date: {date}
-Session: {session}
-Source: {source}
-Ministry: {ministry_info}
-Page: {page}
-Content: {text}
-"""
-                    context_parts.append(context_entry)
-
-            context_text = "\n---\n".join(context_parts)
-
-            prompt = f"""
-You are an official representative of the {ministry or 'Indian Parliament'} in the Indian Parliament.
-
-
-USER QUESTION:
-{question}
-
-
-CONTEXT FROM PARLIAMENTARY RECORDS:
-{context_text}
-
-
-INSTRUCTIONS:
-1. RELEVANCE CHECK:
-   * Answer only if the question relates to {ministry or 'parliamentary'}'s functions, policies, or responsibilities.
-   * If the question is off-topic, respond: "I am unable to answer this question as it is not relevant to the ministry's affairs."
-
-
-2. USING CONTEXT:
-   * Base your answer primarily on the parliamentary records provided in the context.
-   * If the context contains relevant information, cite it specifically (e.g., "According to the record from [date/session]...").
-   * If the context is insufficient but the question is valid, use your knowledge of Indian government policies and programs.
-   * If using general knowledge, clearly state: "Based on general information about the ministry's policies..."
-
-
-3. ANSWER FORMAT:
-   * Begin with a formal answer to the question.
-   * Include specific facts, figures, and dates from the context when available.
-   * Organize information logically with clear sections.
-   * End with any relevant initiatives or future plans mentioned in the context.
-
-
-4. TONE:
-   * Formal and professional
-   * Factual and precise
-   * Solution-oriented
-
-
-Generate a comprehensive, accurate response based on these instructions.
-Do not answer irrelevant questions like what's the climate, etc.
-"""
 
-            return prompt
+            return _build_enhanced_prompt(question, ministry, tuple(sources))
 
         except Exception as e:
             logger.error(f"Error constructing enhanced prompt: {e}")
             return f"You are representing {ministry or 'Parliament'}. Answer this question based on the provided context: {question}"
 
-    def _call_gemini_api(self, prompt: str):
+    def _call_gemini_api(self, prompt: str, stream: bool = False):
 
         try:
-            generation_config = {
-                "temperature": 0.7,
-                "top_p": 0.8,
-                "top_k": 40,
-                "max_output_tokens": 3000,
-            }
-
-            safety_settings = [
-                {
-                    "category": "HARM_CATEGORY_HARASSMENT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE",
-                },
-                {
-                    "category": "HARM_CATEGORY_HATE_SPEECH",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE",
-                },
-                {
-                    "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE",
-                },
-                {
-                    "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                    "threshold": "BLOCK_MEDIUM_AND_ABOVE",
-                },
-            ]
-
             return self.model.generate_content(
                 prompt,
-                generation_config=generation_config,
-                safety_settings=safety_settings,
+                generation_config=GENERATION_CONFIG,
+                safety_settings=SAFETY_SETTINGS,
+                stream=stream,
             )
 
         except Exception as e:
             logger.error(f"Error calling Gemini API: {e}")
             raise
 
+    async def _call_gemini_api_async(self, prompt: str):
+
+        try:
+            # Created lazily so it belongs to self._loop, the only loop using it.
+            if self._semaphore is None:
+                self._semaphore = asyncio.Semaphore(Config.LLM_MAX_CONCURRENCY)
+            async with self._semaphore:
+                return await self.model.generate_content_async(
+                    prompt,
+                    generation_config=GENERATION_CONFIG,
+                    safety_settings=SAFETY_SETTINGS,
+                )
+
+        except Exception as e:
+            logger.error(f"Error calling Gemini API: {e}")
+            raise
+
     def _format_parliamentary_response(
         self, text: str, context_docs: List[Dict[str, Any]]
     ) -> str:
@@ -302,33 +456,7 @@ Do not answer irrelevant questions like what's the climate, etc.
                 return "I apologize, but your question appears to be outside the scope of parliamentary and governmental matters. Please ask questions related to government policies, parliamentary procedures, or ministry functions."
 
             if context_docs and not self._is_irrelevant_response(formatted_text):
-                meaningful_citations = []
-
-                for i, doc in enumerate(
-                    context_docs[:3], 1
-                ):  # Top 3 sources for citations
-                    metadata = doc.get("metadata", {})
-                    date = metadata.get("date", "Unknown date")
-                    session = metadata.get("session", "Unknown session")
-                    source = metadata.get(
-                        "filename", metadata.get("source", "Unknown source")
-                    )
-
-                    if (
-                        date != "Unknown date"
-                        or session
-                        not in ["Unknown session", "4"]  # "4" is also a generic default
-                        or source not in ["Unknown source", "parliamentary_document"]
-                    ):
-
-                        meaningful_citations.append(
-                            f"[{i}] Parliamentary record from Session {session}, dated {date} (Source: {source})"
-                        )
-
-                if meaningful_citations:
-                    formatted_text += f"\n\n**Sources:**\n" + "\n".join(
-                        meaningful_citations
-                    )
+                formatted_text += self._build_citations(context_docs)
 
             return formatted_text
 
@@ -336,24 +464,35 @@ Do not answer irrelevant questions like what's the climate, etc.
             logger.error(f"Error formatting response: {e}")
             return text
 
+    def _build_citations(self, context_docs: List[Dict[str, Any]]) -> str:
+
+        meaningful_citations = []
+
+        for i, doc in enumerate(context_docs[:3], 1):  # Top 3 sources for citations
+            md_get = (doc.get("metadata") or {}).get
+            date = md_get("date", "Unknown date")
+            session = md_get("session", "Unknown session")
+            source = md_get("filename") or md_get("source") or "Unknown source"
+
+            if (
+                date != "Unknown date"
+                or session
+                not in ("Unknown session", "4")  # "4" is also a generic default
+                or source not in ("Unknown source", "parliamentary_document")
+            ):
+
+                meaningful_citations.append(
+                    f"[{i}] Parliamentary record from Session {session}, dated {date} (Source: {source})"
+                )
+
+        if not meaningful_citations:
+            return ""
+
+        return f"\n\n**Sources:**\n" + "\n".join(meaningful_citations)
+
     def _is_irrelevant_response(self, text: str) -> bool:
 
-        irrelevance_indicators = [
-            "unable to answer this question as it is not relevant to the ministry's affairs",
-            "not relevant to the ministry's functions",
-            "does not fall under the purview of this ministry",
-            "outside the scope of this ministry",
-            "not within the jurisdiction of this ministry",
-            "not relevant to",
-            "outside the scope",
-            "not related to parliamentary",
-            "not within the jurisdiction",
-            "unrelated to government",
-            "cannot answer this question as it is not relevant",
-        ]
-
-        text_lower = text.lower()
-        return any(indicator in text_lower for indicator in irrelevance_indicators)
+        return _IRRELEVANCE_RE.search(text) is not None
 
     def _get_error_response(self) -> str:
 
@@ -384,7 +523,7 @@ Do not answer irrelevant questions like what's the climate, etc.
     def __del__(self):
 
         try:
-            if hasattr(self, "executor"):
-                self.executor.shutdown(wait=True)
+            if hasattr(self, "_loop"):
+                self._loop.call_soon_threadsafe(self._loop.stop)
         except Exception as e:
-            logger.error(f"Error shutting down LLM client executor: {e}")
+            logger.error(f"Error shutting down LLM client event loop: {e}")
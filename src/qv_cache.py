@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class QVCache:
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        min_threshold: float = 0.85,
+        max_entries: int = 512,
+        ttl: float = 3600,
+    ):
+
+        self.threshold = threshold
+        self.min_threshold = min_threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Per ministry: unit query embeddings (rows), per-entry thresholds,
+        # insert times, the unit embedding of each entry's closest document and
+        # the cached top-k results, kept as a ring buffer of max_entries.
+        # Ingest runs in other processes, so ttl is the only invalidation.
+        self._embeddings: Dict[str, np.ndarray] = {}
+        self._thresholds: Dict[str, np.ndarray] = {}
+        self._inserted_at: Dict[str, np.ndarray] = {}
+        self._best_documents: Dict[str, np.ndarray] = {}
+        self._results: Dict[str, List[List[Dict[str, Any]]]] = {}
+        self._next_slot: Dict[str, int] = {}
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _nearest(self, ministry: str, query: np.ndarray):
+
+        embeddings = self._embeddings.get(ministry)
+        if embeddings is None:
+            return None, 0.0
+
+        count = len(self._results[ministry])
+        scores = embeddings[:count] @ query
+        # Expired entries never match, so results age out like _cached_search.
+        expired = self._inserted_at[ministry][:count] < time.monotonic() - self.ttl
+        scores[expired] = -np.inf
+        idx = int(np.argmax(scores))
+        if not np.isfinite(scores[idx]):
+            return None, 0.0
+        return idx, float(scores[idx])
+
+    def get(
+        self, ministry: str, embedding: Sequence[float], n_results: int = None
+    ) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+
+        query = self._normalize(embedding)
+        with self._lock:
+            idx, similarity = self._nearest(ministry, query)
+            if idx is None or similarity < self._thresholds[ministry][idx]:
+                return None
+
+            # Cached distances belong to the query that filled the entry; the
+            # best distance is recomputed for this query against the entry's
+            # closest document.
+            best_distance = 1.0 - float(self._best_documents[ministry][idx] @ query)
+            logger.debug(f"Query cache hit for {ministry} (cosine {similarity:.3f})")
+            return self._results[ministry][idx][:n_results], best_distance
+
+    def put(
+        self,
+        ministry: str,
+        embedding: Sequence[float],
+        documents: List[Dict[str, Any]],
+        best_document_embedding: Sequence[float],
+    ):
+
+        if not documents:
+            return
+
+        query = self._normalize(embedding)
+        with self._lock:
+            idx, similarity = self._nearest(ministry, query)
+
+            # A miss whose nearest neighbour returned the same documents means
+            # that entry's region is wider than its threshold: relax it instead
+            # of storing a duplicate.
+            if idx is not None and similarity >= self.min_threshold:
+                cached_ids = [doc.get("id") for doc in self._results[ministry][idx]]
+                if cached_ids == [doc.get("id") for doc in documents]:
+                    self._thresholds[ministry][idx] = max(
+                        self.min_threshold, similarity
+                    )
+                    return
+
+            if ministry not in self._embeddings:
+                self._embeddings[ministry] = np.zeros(
+                    (self.max_entries, query.shape[0]), dtype=np.float32
+                )
+                self._thresholds[ministry] = np.full(
+                    self.max_entries, self.threshold, dtype=np.float32
+                )
+                self._inserted_at[ministry] = np.zeros(self.max_entries)
+                self._best_documents[ministry] = np.zeros_like(
+                    self._embeddings[ministry]
+                )
+                self._results[ministry] = []
+                self._next_slot[ministry] = 0
+
+            slot = self._next_slot[ministry]
+            self._embeddings[ministry][slot] = query
+            self._thresholds[ministry][slot] = self.threshold
+            self._inserted_at[ministry][slot] = time.monotonic()
+            self._best_documents[ministry][slot] = self._normalize(
+                best_document_embedding
+            )
+            if slot < len(self._results[ministry]):
+                self._results[ministry][slot] = documents
+            else:
+                self._results[ministry].append(documents)
+            self._next_slot[ministry] = (slot + 1) % self.max_entries
@@ -0,0 +1,46 @@
+import logging
+import threading
+from typing import Any, Dict, List
+
+import torch
+from sentence_transformers import CrossEncoder
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoder:
+
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+                _model = CrossEncoder(Config.RERANKER_MODEL, device=device)
+                logger.info(f"Loaded reranker {Config.RERANKER_MODEL} on {device}")
+    return _model
+
+
+def rerank(
+    query: str, documents: List[Dict[str, Any]], top_k: int = Config.RERANK_TOP_K
+) -> List[Dict[str, Any]]:
+
+    if len(documents) <= 1:
+        return documents[:top_k]
+
+    try:
+        scores = get_reranker().predict(
+            [(query, doc["text"]) for doc in documents], show_progress_bar=False
+        )
+    except Exception as e:
+        logger.error(f"Error reranking documents: {e}")
+        return documents[:top_k]
+
+    ranked = sorted(zip(scores, documents), key=lambda pair: pair[0], reverse=True)
+    return [
+        {**doc, "rerank_score": float(score)} for score, doc in ranked[:top_k]
+    ]